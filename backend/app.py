@@ -1,12 +1,16 @@
 from flask import Flask, jsonify, request
 from flask_cors import CORS
 from community_betting import CommunityBettingGame  
+from equilibrium_index import load_equilibrium_index
 
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "http://localhost:3000", "methods": ["GET", "POST", "OPTIONS"]}})  
 
 game = CommunityBettingGame()
 
+# Precomputed equilibria, memory-mapped once per worker
+equilibrium_index = load_equilibrium_index()
+
 # Global game state
 game_state = {
     'communityScore': 100,
@@ -81,6 +85,18 @@ def reset_game():
     action_history = []
     return jsonify({'message': 'Game reset successfully'})
 
+@app.route('/equilibrium', methods=['GET'])
+def get_equilibrium():
+    if equilibrium_index is None:
+        return jsonify({'error': 'Equilibrium index has not been built'}), 503
+    try:
+        values = {name: float(value) for name, value in request.args.items()}
+        results = equilibrium_index.query(**values)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({name: {'strategy': strategy.tolist(), 'error_bound': bound.tolist()}
+                    for name, (strategy, bound) in results.items()})
+
 @app.route('/api/port', methods=['GET'])
 def get_port():
     return jsonify({'port': current_app.config['PORT']})
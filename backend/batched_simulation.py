@@ -0,0 +1,215 @@
+import numpy as np
+
+ROLES = ['bank', 'odd_setter', 'validator']
+ROLE_BONUSES = np.array([20.0, 15.0, 10.0])  # Same order as ROLES
+
+def resolve_rng(rng=None):
+    """
+    The generator to draw from: rng itself, or without one a generator seeded from the
+    global np.random state, so np.random.seed makes the batched engine reproducible too.
+    """
+    return np.random.default_rng(np.random.randint(2**32, dtype=np.uint64)) if rng is None else rng
+
+def draw_uniforms(n_games, n_layer1=2, n_layer2=3, rng=None, antithetic=False):
+    """
+    The uniform variates behind n_games rounds. With antithetic=True only half of the
+    games are drawn and each is paired with its mirror image 1 - u, stored right after it.
+    """
+    rng = resolve_rng(rng)
+    n_drawn = (n_games + 1) // 2 if antithetic else n_games
+    uniforms = {
+        'layer1_bets': rng.random((n_drawn, n_layer1)),
+        'layer1_outcome': rng.random(n_drawn),
+        'layer2_predictions': rng.random((n_drawn, n_layer2)),
+        'layer2_bets': rng.random((n_drawn, n_layer2)),
+        'role_order': rng.random((n_drawn, len(ROLES))),
+    }
+    if antithetic:
+        for name, u in uniforms.items():
+            uniforms[name] = np.stack([u, 1 - u], axis=1).reshape((2 * n_drawn,) + u.shape[1:])[:n_games]
+    return uniforms
+
+def rounds_from_uniforms(uniforms, max_bet):
+    """
+    Turn uniform variates into rounds. Sharing uniforms between parameter sets gives
+    them common random numbers.
+    """
+    return {
+        'layer1_bets': 1 + (max_bet - 1) * uniforms['layer1_bets'],
+        'layer1_outcome': uniforms['layer1_outcome'] < 0.5,
+        'layer2_predictions': uniforms['layer2_predictions'] < 0.5,
+        'layer2_bets': 1 + (max_bet - 1) * uniforms['layer2_bets'],
+        'role_order': np.argsort(uniforms['role_order'], axis=1),
+    }
+
+def draw_rounds(n_games, max_bet, n_layer1=2, n_layer2=3, rng=None, antithetic=False):
+    """
+    Draw the randomness of n_games independent Game.run_game rounds as arrays:
+    bets, the layer 1 outcome, layer 2 predictions and the role permutation.
+    """
+    return rounds_from_uniforms(draw_uniforms(n_games, n_layer1, n_layer2, rng, antithetic), max_bet)
+
+def layer1_payoffs(bets, outcome):
+    """
+    Vectorized Game._calculate_layer1_payoffs for bets of shape (n_games, n_layer1).
+    """
+    payoffs = -bets
+    winner_index = np.where(outcome, 0, 1)
+    payoffs[np.arange(len(bets)), winner_index] = bets.sum(axis=1)
+    return payoffs
+
+def layer2_payoffs(bets, outcome, predictions, role_order, observer_multiplier, max_bet):
+    """
+    Vectorized Game._calculate_layer2_payoffs. role_order[g, j] indexes ROLES for the
+    j-th layer 2 player of game g; players beyond the number of roles get no bonus.
+    """
+    correct = predictions == outcome[:, None]
+    payoffs = np.where(correct, bets * observer_multiplier, -bets)
+
+    avg_bet = bets.mean(axis=1, keepdims=True)
+    payoffs -= np.abs(bets - avg_bet) / max_bet * bets * 0.5
+
+    disagreement = predictions.any(axis=1) & ~predictions.all(axis=1)
+    n_roles = min(role_order.shape[1], bets.shape[1])
+    role_bonus = np.zeros_like(bets)
+    role_bonus[:, :n_roles] = ROLE_BONUSES[role_order[:, :n_roles]]
+    payoffs += np.where(disagreement[:, None], role_bonus, 0.0)
+
+    return np.maximum(payoffs, 0)
+
+def community_scores(bets, max_bet, community_score=50):
+    """
+    Vectorized Game.update_community_score for bets of shape (n_games, n_players).
+    """
+    avg_bet = bets.mean(axis=1)
+    score = community_score + np.where(avg_bet <= max_bet / 2, 1.0, -1.0)
+    alignment = 1 - np.abs(bets - avg_bet[:, None]).mean(axis=1) / max_bet
+    score = score + alignment * 2
+    return np.clip(score, 0, 100)
+
+def reputations(bets, payoffs, max_bet, reputation=0.5):
+    """
+    Vectorized Game.update_reputations for bets and payoffs of shape (n_games, n_players).
+    """
+    avg_bet = bets.mean(axis=1, keepdims=True)
+    bet_score = 1 - np.abs(bets - avg_bet) / max_bet
+    payoff_score = (payoffs + max_bet) / (2 * max_bet)
+    return np.clip(reputation + 0.2 * (bet_score + payoff_score - 1), 0, 1)
+
+def settle_rounds(params, rounds):
+    """
+    Settle drawn rounds exactly as Game.run_game does for a freshly created Game.
+
+    Returns layer 1 payoffs, layer 2 payoffs, community scores, reputations and
+    cumulative profits, each with a leading n_games axis.
+    """
+    max_bet = params.max_bet
+    layer1_bets = np.minimum(rounds['layer1_bets'], max_bet)
+    layer2_bets = np.minimum(rounds['layer2_bets'], max_bet)
+    outcome = rounds['layer1_outcome']
+
+    l1_payoffs = layer1_payoffs(layer1_bets, outcome)
+    l2_payoffs = layer2_payoffs(layer2_bets, outcome, rounds['layer2_predictions'], rounds['role_order'],
+                                params.observer_multiplier, max_bet)
+
+    bets = np.concatenate([layer1_bets, layer2_bets], axis=1)
+    payoffs = np.concatenate([l1_payoffs, l2_payoffs], axis=1)
+    scores = community_scores(bets, max_bet)
+    player_reputations = reputations(bets, payoffs, max_bet)
+
+    return l1_payoffs, l2_payoffs, scores, player_reputations, payoffs
+
+def player_counts(params, n_layer1=None, n_layer2=None):
+    """
+    Layer 1 and layer 2 player counts, by default those of a Game built from params.
+    """
+    n_layer1 = params.n_base_players if n_layer1 is None else n_layer1
+    n_layer2 = params.n_players - params.n_base_players if n_layer2 is None else n_layer2
+    return n_layer1, n_layer2
+
+def stream_games(params, n_games, n_layer1=None, n_layer2=None, rng=None, chunk_size=1 << 20, antithetic=False):
+    """
+    Play n_games single-round games in chunks of at most chunk_size games, yielding
+    the settle_rounds histories of each chunk. With antithetic=True consecutive games
+    are antithetic pairs (see draw_uniforms).
+    """
+    n_layer1, n_layer2 = player_counts(params, n_layer1, n_layer2)
+    rng = resolve_rng(rng)
+    chunk_size += chunk_size % 2  # Keep antithetic pairs within a chunk
+    for start in range(0, n_games, chunk_size):
+        rounds = draw_rounds(min(chunk_size, n_games - start), params.max_bet, n_layer1, n_layer2, rng, antithetic)
+        yield settle_rounds(params, rounds)
+
+def simulate_games(params, n_games, n_layer1=None, n_layer2=None, rng=None, chunk_size=1 << 20):
+    """
+    Play n_games independent single-round games as arrays, in chunks of chunk_size
+    games, and return the same five histories as model_analysis.run_simulation.
+    """
+    n_layer1, n_layer2 = player_counts(params, n_layer1, n_layer2)
+    n_total = n_layer1 + n_layer2
+    histories = (
+        np.empty((n_games, n_layer1)),
+        np.empty((n_games, n_layer2)),
+        np.empty(n_games),
+        np.empty((n_games, n_total)),
+        np.empty((n_games, n_total)),
+    )
+
+    start = 0
+    for chunk in stream_games(params, n_games, n_layer1, n_layer2, rng, chunk_size):
+        stop = start + len(chunk[2])
+        for history, values in zip(histories, chunk):
+            history[start:stop] = values
+        start = stop
+
+    return histories
+
+def compare_parameter_sets(parameter_sets, n_games, common_random_numbers=True, antithetic=False, rng=None,
+                           chunk_size=1 << 18):
+    """
+    Estimate the mean layer 1, layer 2 and total profit per game for each GameParameters
+    in parameter_sets, and each set's difference from the first set with its standard error.
+
+    With common_random_numbers=True every set plays the same draws, so differences are
+    measured game by game; with antithetic=True games come in antithetic pairs, and
+    standard errors are computed over pair averages. Returns a dict of (n_sets, 3)
+    arrays 'means', 'differences' and 'std_errors'.
+    """
+    rng = resolve_rng(rng)
+    n_sets = len(parameter_sets)
+    counts = [player_counts(params) for params in parameter_sets]
+    if common_random_numbers and len(set(counts)) > 1:
+        raise ValueError("Common random numbers need every parameter set to have the same player counts")
+    chunk_size += chunk_size % 2
+    pair = 2 if antithetic else 1
+    # Per set: running sums of the profits and of the (paired) differences and their squares
+    sums = np.zeros((n_sets, 3))
+    difference_sums = np.zeros((n_sets, 3))
+    difference_squares = np.zeros((n_sets, 3))
+    n_units = 0
+
+    for start in range(0, n_games, chunk_size):
+        n_chunk = min(chunk_size, n_games - start)
+        n_chunk -= n_chunk % pair
+        shared = draw_uniforms(n_chunk, *counts[0], rng=rng, antithetic=antithetic) if common_random_numbers else None
+        profits = []
+        for params, (n_layer1, n_layer2) in zip(parameter_sets, counts):
+            uniforms = shared if common_random_numbers else draw_uniforms(n_chunk, n_layer1, n_layer2, rng, antithetic)
+            l1, l2 = settle_rounds(params, rounds_from_uniforms(uniforms, params.max_bet))[:2]
+            profit = np.stack([l1.sum(axis=1), l2.sum(axis=1), l1.sum(axis=1) + l2.sum(axis=1)], axis=1)
+            # Antithetic pairs are averaged into one independent unit
+            profits.append(profit.reshape(-1, pair, 3).mean(axis=1))
+        for k, profit in enumerate(profits):
+            difference = profit - profits[0]
+            sums[k] += profit.sum(axis=0)
+            difference_sums[k] += difference.sum(axis=0)
+            difference_squares[k] += (difference ** 2).sum(axis=0)
+        n_units += n_chunk // pair
+
+    differences = difference_sums / n_units
+    variances = (difference_squares - n_units * differences ** 2) / max(n_units - 1, 1)
+    return {
+        'means': sums / n_units,
+        'differences': differences,
+        'std_errors': np.sqrt(np.maximum(variances, 0) / n_units),
+    }
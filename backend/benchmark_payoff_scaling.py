@@ -0,0 +1,48 @@
+import time
+import numpy as np
+from mathematical_model import Game, GameParameters
+from nash_equilibrium_solver import best_responses
+
+def _best_time(function, repeats=5):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def _scaling_exponent(sizes, times):
+    # Slope of log(time) against log(n_players): 1 for linear, 2 for quadratic scaling
+    return np.polyfit(np.log(sizes), np.log(times), 1)[0]
+
+def benchmark_payoff_scaling(sizes=(100, 1000, 10000, 100000), loop_sizes=(1000, 3000, 10000), grid_size=65):
+    """
+    Time full payoff evaluations and best-response screens of every player for games
+    of the given sizes (two base players, the rest observers), against the per-player
+    _pi_i loop for the smaller loop_sizes. Returns the timings by method.
+    """
+    rng = np.random.default_rng(0)
+    timings = {"payoff_vector": [], "best_response_screen": [], "pi_i_loop": []}
+
+    for n_players in sizes:
+        game = Game(GameParameters(n_players=n_players, n_base_players=2), time_constraint=10, rng=rng)
+        X = rng.uniform(1, game.max_bet, n_players)
+        timings["payoff_vector"].append(_best_time(lambda: game.payoff_vector(X)))
+        timings["best_response_screen"].append(
+            _best_time(lambda: best_responses(game, X, grid_size=grid_size, polish=False), repeats=3))
+        print(f"{n_players:>7} players: payoff_vector {timings['payoff_vector'][-1] * 1e3:9.3f} ms, "
+              f"best-response screen ({grid_size} bets each) {timings['best_response_screen'][-1] * 1e3:9.3f} ms")
+
+    for n_players in loop_sizes:
+        game = Game(GameParameters(n_players=n_players, n_base_players=2), time_constraint=10, rng=rng)
+        X = rng.uniform(1, game.max_bet, n_players)
+        timings["pi_i_loop"].append(_best_time(lambda: [game._pi_i(X[i], X, i) for i in range(n_players)], repeats=1))
+        print(f"{n_players:>7} players: per-player _pi_i loop {timings['pi_i_loop'][-1] * 1e3:9.3f} ms")
+
+    print(f"Scaling exponents: payoff_vector {_scaling_exponent(sizes, timings['payoff_vector']):.2f}, "
+          f"best-response screen {_scaling_exponent(sizes, timings['best_response_screen']):.2f}, "
+          f"_pi_i loop {_scaling_exponent(loop_sizes, timings['pi_i_loop']):.2f}")
+    return timings
+
+if __name__ == "__main__":
+    benchmark_payoff_scaling()
@@ -42,7 +42,7 @@ class CommunityBettingGame:
         return True, f"Player {player_index} placed a bet of {amount}. Alignment with community: {alignment:.2f}"
 
     def evaluate_bet_alignment(self, bet):
-        avg_bet = np.mean([player.bet for player in self.game.layer1_players + self.game.layer2_players])
+        avg_bet = np.mean(self.game.players.bet)
         alignment = 1 - abs(bet - avg_bet) / self.game.max_bet
         return alignment
 
@@ -50,7 +50,7 @@ class CommunityBettingGame:
         # Ensure all layer2 players have made a prediction
         for player in self.game.layer2_players:
             if player.prediction is None:
-                player.make_prediction(np.random.choice([True, False]))
+                player.make_prediction(self.game.rng.choice([True, False]))
 
         layer1_payoffs = self.game._calculate_layer1_payoffs([player.bet for player in self.game.layer1_players], layer1_outcome)
         
@@ -0,0 +1,85 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+import numpy as np
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.equilibrium_cache')
+RESULT_NAMES = ('ne', 'bne', 'cbne')
+
+class EquilibriumCache:
+    """
+    Content-addressed store for (ne, bne, cbne) results: an in-memory LRU of at most
+    max_entries results in front of one .npz file per key in directory. Results that
+    are None are stored as missing arrays.
+    """
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_entries=128):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(params, time_constraint, type_distributions, solver_version):
+        content = {
+            'params': params.__dict__,
+            'time_constraint': time_constraint,
+            'type_distributions': np.asarray(type_distributions, dtype=float).tolist(),
+            'solver_version': solver_version,
+        }
+        return hashlib.sha256(json.dumps(content, sort_keys=True, default=float).encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.npz')
+
+    def get(self, key):
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+        path = self._path(key)
+        if os.path.exists(path):
+            with np.load(path) as stored:
+                results = tuple(stored[name] if name in stored else None for name in RESULT_NAMES)
+            self._remember(key, results)
+            self.hits += 1
+            return results
+
+        self.misses += 1
+        return None
+
+    def put(self, key, results):
+        self._remember(key, results)
+        os.makedirs(self.directory, exist_ok=True)
+        arrays = {name: np.asarray(value) for name, value in zip(RESULT_NAMES, results) if value is not None}
+        # Write under a temporary name first so concurrent readers never see a partial file
+        tmp_path = f"{self._path(key)}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, self._path(key))
+
+    def _remember(self, key, results):
+        self._entries[key] = results
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+        if os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if name.endswith('.npz'):
+                    os.remove(os.path.join(self.directory, name))
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
+
+_default_cache = None
+
+def default_cache():
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = EquilibriumCache()
+    return _default_cache
@@ -0,0 +1,123 @@
+import itertools
+import json
+import os
+import numpy as np
+from mathematical_model import Game, GameParameters
+from nash_equilibrium_solver import SOLVER_VERSION, _game_at, solve_continuation
+
+DEFAULT_INDEX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.equilibrium_index')
+INDEX_ARRAYS = ('ne', 'bne')
+
+def build_equilibrium_index(directory=DEFAULT_INDEX_DIR, grid=None, time_constraints=(5, 10, 20, 40),
+                            params=None, type_distributions=None, seed=0):
+    """
+    Precompute NE and BNE strategies over grid (parameter name to increasing values) times
+    time_constraints, and write them with a meta.json describing the axes to directory.
+    """
+    params = GameParameters() if params is None else params
+    grid = {'alpha': [0.05, 0.1, 0.2], 'observer_multiplier': [1.0, 1.5, 2.0]} if grid is None else grid
+    for name in ('n_players', 'n_base_players'):
+        if name in grid:
+            raise ValueError(f"{name} changes the shape of the strategies and cannot be an index axis")
+    type_distributions = [[0.7, 0.3]] * params.n_players if type_distributions is None else type_distributions
+
+    axes = {name: [float(value) for value in values] for name, values in grid.items()}
+    axes['time_constraint'] = [float(value) for value in time_constraints]
+    for name, values in axes.items():
+        if np.any(np.diff(values) <= 0):
+            raise ValueError(f"Values of index axis {name} must be increasing")
+
+    game = Game(params, time_constraint=axes['time_constraint'][0], rng=np.random.default_rng(seed))
+    shape = tuple(len(values) for values in axes.values())
+    ne = np.empty(shape + (params.n_players,))
+    bne = np.empty(shape + (params.n_players, len(type_distributions[0])))
+
+    names = list(grid)
+    for cell in itertools.product(*(range(len(axes[name])) for name in names)):
+        point = game
+        for name, i in zip(names, cell):
+            point = _game_at(point, name, axes[name][i])
+        print(f"Equilibrium index: solving {dict((name, axes[name][i]) for name, i in zip(names, cell))}")
+        ne[cell] = solve_continuation(point, 'time_constraint', axes['time_constraint']).x
+        bne[cell] = solve_continuation(point, 'time_constraint', axes['time_constraint'], solver='bayesian',
+                                       type_distributions=type_distributions).x
+
+    os.makedirs(directory, exist_ok=True)
+    for name, values in zip(INDEX_ARRAYS, (ne, bne)):
+        np.save(os.path.join(directory, name + '.npy'), values)
+    meta = {'axes': axes, 'params': params.__dict__, 'type_distributions': np.asarray(type_distributions).tolist(),
+            'solver_version': SOLVER_VERSION, 'seed': seed}
+    # meta.json is written last, so a directory without it holds no usable index
+    with open(os.path.join(directory, 'meta.json.tmp'), 'w') as f:
+        json.dump(meta, f)
+    os.replace(os.path.join(directory, 'meta.json.tmp'), os.path.join(directory, 'meta.json'))
+    return directory
+
+class EquilibriumIndex:
+    """
+    Memory-mapped index written by build_equilibrium_index, queried by multilinear
+    interpolation with the spread of the cell's corner values as error bound.
+    """
+    def __init__(self, directory=DEFAULT_INDEX_DIR):
+        with open(os.path.join(directory, 'meta.json')) as f:
+            self.meta = json.load(f)
+        if self.meta.get('solver_version') != SOLVER_VERSION:
+            raise ValueError(f"Equilibrium index in {directory} was built with solver version "
+                             f"{self.meta.get('solver_version')}, current is {SOLVER_VERSION}; rebuild it")
+        self.axes = {name: np.asarray(values) for name, values in self.meta['axes'].items()}
+        self.arrays = {name: np.load(os.path.join(directory, name + '.npy'), mmap_mode='r') for name in INDEX_ARRAYS}
+
+    def _cell(self, values):
+        # Slice of the grid cell holding the point and its interpolation weights along
+        # each axis; axes where the point sits on a grid value keep only that value
+        unknown = set(values) - set(self.axes)
+        if unknown:
+            raise ValueError(f"Unknown index axes: {', '.join(sorted(unknown))}")
+        cell, weights = [], []
+        for name, grid in self.axes.items():
+            if name not in values:
+                raise ValueError(f"Missing value for index axis {name}")
+            value = float(values[name])
+            if not grid[0] <= value <= grid[-1]:
+                raise ValueError(f"{name}={value:g} is outside the index range [{grid[0]:g}, {grid[-1]:g}]")
+            i = np.searchsorted(grid, value)
+            if grid[i] == value:
+                cell.append(slice(i, i + 1))
+                weights.append(np.ones(1))
+            else:
+                t = (value - grid[i - 1]) / (grid[i] - grid[i - 1])
+                cell.append(slice(i - 1, i + 1))
+                weights.append(np.array([1 - t, t]))
+        return tuple(cell), weights
+
+    def query(self, **values):
+        """
+        Interpolated strategies at the given value of every index axis, as
+        {name: (strategy, error_bound)} for each stored array.
+        """
+        cell, weights = self._cell(values)
+        results = {}
+        for name, array in self.arrays.items():
+            corners = np.asarray(array[cell])
+            value = corners
+            for w in weights:
+                value = np.tensordot(w, value, axes=1)
+            corners = corners.reshape((-1,) + value.shape)
+            results[name] = (value, corners.max(axis=0) - corners.min(axis=0))
+        return results
+
+def load_equilibrium_index(directory=DEFAULT_INDEX_DIR):
+    """
+    The index in directory, or None if it has not been built or is stale.
+    """
+    if not os.path.exists(os.path.join(directory, 'meta.json')):
+        print(f"No equilibrium index in {directory}; run equilibrium_index.py to build it")
+        return None
+    try:
+        return EquilibriumIndex(directory)
+    except ValueError as e:
+        print(e)
+        return None
+
+if __name__ == "__main__":
+    build_equilibrium_index()
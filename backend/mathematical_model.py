@@ -1,4 +1,6 @@
 import numpy as np
+from itertools import permutations
+from batched_simulation import ROLES, layer1_payoffs, layer2_payoffs
 
 class GameParameters:
     def __init__(self, n_players=5, n_base_players=2, alpha=0.1, beta=0.05, observer_multiplier=1.5, greed_factor=0.2, group_factor=0.3, community_factor=1.0, stability_factor=0.3, max_bet=80, base_payoff=20, layer1_bonus=10):
@@ -16,17 +18,100 @@ class GameParameters:
         self.reputation_factor = 0.4  # Increased from 0.2
         self.layer1_bonus = layer1_bonus
 
+ROLE_NAMES = ['base', 'observer', 'bank', 'odd_setter', 'validator']
+
+class PlayerTable:
+    """
+    Structure-of-arrays storage for player state, one row per player.
+    Roles are stored as indices into ROLE_NAMES and predictions as -1 (none), 0 or 1.
+    """
+    COLUMNS = ('id', 'role', 'sigma', 'bet', 'prediction', 'reputation', 'cumulative_profit', 'is_observer')
+
+    def __init__(self, n_players):
+        self.id = np.arange(n_players)
+        self.role = np.zeros(n_players, dtype=np.int8)
+        self.sigma = np.ones(n_players)
+        self.bet = np.zeros(n_players)
+        self.prediction = np.full(n_players, -1, dtype=np.int8)
+        self.reputation = np.full(n_players, 0.5)
+        self.cumulative_profit = np.zeros(n_players)
+        self.is_observer = np.zeros(n_players, dtype=bool)
+
+    def __len__(self):
+        return len(self.sigma)
+
+    @classmethod
+    def concatenate(cls, tables):
+        table = cls(0)
+        for column in cls.COLUMNS:
+            setattr(table, column, np.concatenate([getattr(t, column) for t in tables]))
+        return table
+
+    @classmethod
+    def from_players(cls, players):
+        table = cls(len(players))
+        for column in cls.COLUMNS:
+            values = [getattr(player._table, column)[player._row] for player in players]
+            setattr(table, column, np.array(values, dtype=getattr(table, column).dtype))
+        return table
+
+def _column_property(column):
+    def fget(self):
+        return getattr(self._table, column)[self._row].item()
+
+    def fset(self, value):
+        getattr(self._table, column)[self._row] = value
+
+    return property(fget, fset)
+
 class Player:
+    """
+    A view of one row of a PlayerTable. A Player created directly owns a one-row table.
+    """
+    __slots__ = ('_table', '_row', 'game', 'vote')
+
     def __init__(self, id, role, sigma):
+        self._table = PlayerTable(1)
+        self._row = 0
         self.id = id
         self.role = role
         self.sigma = sigma
-        self.bet = 0
         self.vote = None
-        self.prediction = None
-        self.reputation = 0.5
-        self.cumulative_profit = 0
-        self.is_observer = False
+
+    @classmethod
+    def view(cls, table, row, game):
+        player = cls.__new__(cls)
+        player._table = table
+        player._row = row
+        player.game = game
+        player.vote = None
+        return player
+
+    id = _column_property('id')
+    sigma = _column_property('sigma')
+    bet = _column_property('bet')
+    reputation = _column_property('reputation')
+    cumulative_profit = _column_property('cumulative_profit')
+    is_observer = _column_property('is_observer')
+
+    @property
+    def role(self):
+        return ROLE_NAMES[self._table.role[self._row]]
+
+    @role.setter
+    def role(self, role):
+        if role not in ROLE_NAMES:
+            raise ValueError(f"Unknown role: {role}")
+        self._table.role[self._row] = ROLE_NAMES.index(role)
+
+    @property
+    def prediction(self):
+        code = self._table.prediction[self._row]
+        return None if code < 0 else bool(code)
+
+    @prediction.setter
+    def prediction(self, prediction):
+        self._table.prediction[self._row] = -1 if prediction is None else int(bool(prediction))
 
     def place_bet(self, amount):
         self.bet = min(amount, self.game.max_bet)
@@ -48,39 +133,79 @@ class Player:
         return new_player
 
 class Game:
-    def __init__(self, params, time_constraint):
+    def __init__(self, params, time_constraint, rng=None):
+        if not 2 <= params.n_base_players <= params.n_players:
+            raise ValueError(f"Need at least 2 base players and no more than n_players, got "
+                             f"n_base_players={params.n_base_players}, n_players={params.n_players}")
         self.params = params
         self.time_constraint = time_constraint
-        self.layer1_players = self._initialize_players(2, 'base')
-        self.layer2_players = self._initialize_players(3, 'observer')
-        self.layer3_players = self._initialize_players(0, 'bank')
+        self._rng = rng
+        self.players = PlayerTable.concatenate([
+            self._initialize_players(params.n_base_players, 'base'),
+            self._initialize_players(params.n_players - params.n_base_players, 'observer'),
+        ])
+        self._bind_players(params.n_base_players)
+        self.layer3_players = []
         self.max_bet = params.max_bet
         self.community_score = 50
         self.roles = ['bank', 'odd_setter', 'validator']  # Restore this line
 
+    @property
+    def rng(self):
+        """
+        Source of all of the game's randomness: the rng passed in, e.g. a seeded
+        np.random.Generator, or the global np.random state.
+        """
+        return np.random if self._rng is None else self._rng
+
     def _initialize_players(self, num_players, role):
-        players = []
-        for i in range(num_players):
-            sigma = np.random.uniform(0.5, 1.5)
-            player = Player(i, role, sigma)
-            player.game = self
-            players.append(player)
+        players = PlayerTable(num_players)
+        players.role[:] = ROLE_NAMES.index(role)
+        players.sigma[:] = self.rng.uniform(0.5, 1.5, size=num_players)
         return players
 
+    def _bind_players(self, n_layer1, votes=()):
+        views = [Player.view(self.players, row, self) for row in range(len(self.players))]
+        for player, vote in zip(views, votes):
+            player.vote = vote
+        self._layer1_players = views[:n_layer1]
+        self._layer2_players = views[n_layer1:]
+
+    def _set_players(self, layer1_players, layer2_players):
+        players = list(layer1_players) + list(layer2_players)
+        self.players = PlayerTable.from_players(players)
+        self._bind_players(len(layer1_players), [player.vote for player in players])
+
+    @property
+    def layer1_players(self):
+        return self._layer1_players
+
+    @layer1_players.setter
+    def layer1_players(self, players):
+        self._set_players(players, self._layer2_players)
+
+    @property
+    def layer2_players(self):
+        return self._layer2_players
+
+    @layer2_players.setter
+    def layer2_players(self, players):
+        self._set_players(self._layer1_players, players)
+
     def run_game(self):
-        layer1_bets = [player.place_bet(np.random.uniform(1, self.max_bet)) for player in self.layer1_players]
-        layer1_outcome = np.random.choice([True, False])
+        layer1_bets = [player.place_bet(self.rng.uniform(1, self.max_bet)) for player in self.layer1_players]
+        layer1_outcome = self.rng.choice([True, False])
 
         layer2_bets = []
         layer2_predictions = []
         for player in self.layer2_players:
-            player.make_prediction(np.random.choice([True, False]))
+            player.make_prediction(self.rng.choice([True, False]))
             layer2_predictions.append(player.prediction)
-            layer2_bets.append(player.place_bet(np.random.uniform(1, self.max_bet)))
+            layer2_bets.append(player.place_bet(self.rng.uniform(1, self.max_bet)))
             player.is_observer = True  # Ensure all layer 2 players are marked as observers
 
         # Assign roles, but keep all layer 2 players as observers for payout purposes
-        np.random.shuffle(self.roles)
+        self.rng.shuffle(self.roles)
         for player, role in zip(self.layer2_players, self.roles):
             player.role = role
 
@@ -106,7 +231,7 @@ class Game:
 
         for player, bet, prediction in zip(self.layer2_players, bets, predictions):
             if prediction is None:
-                prediction = np.random.choice([True, False])
+                prediction = self.rng.choice([True, False])
             
             # Base payoff calculation
             if layer1_outcome == prediction:
@@ -135,17 +260,60 @@ class Game:
 
         return payoffs
 
+    def expected_round_payoffs(self, bets, max_cases=1 << 16):
+        """
+        Exact distribution of the payoffs run_game pays out for the given bets, one per
+        player with layer 1 players first.
+
+        Given the bets, the only randomness in a round is the layer 1 outcome, the layer 2
+        predictions and the role permutation, all uniform, so every combination of them is
+        an equally likely case (2 * 8 * 6 for the default game). The cases are settled in
+        one vectorized pass. Returns a dict with the per-player 'expected' payoffs and
+        their 'variance', and the distribution: per-case 'payoffs' (n_cases, n_players),
+        'probabilities', 'outcome', 'predictions' and 'role_order' (indices into ROLES).
+        """
+        n_layer1, n_layer2 = len(self.layer1_players), len(self.layer2_players)
+        role_orders = np.array(list(permutations(range(len(ROLES)))))
+        n_cases = 2 * 2**n_layer2 * len(role_orders)
+        if n_cases > max_cases:
+            raise ValueError(f"Enumerating {n_layer2} layer 2 players needs {n_cases} cases, more than max_cases={max_cases}")
+
+        outcome_index, prediction_index, role_index = np.indices((2, 2**n_layer2, len(role_orders))).reshape(3, -1)
+        outcome = outcome_index == 0
+        predictions = (prediction_index[:, None] >> np.arange(n_layer2)) & 1 == 1
+        role_order = role_orders[role_index]
+
+        bets = np.minimum(np.asarray(bets, dtype=float), self.max_bet)
+        l1_payoffs = layer1_payoffs(np.repeat(bets[None, :n_layer1], n_cases, axis=0), outcome)
+        l2_payoffs = layer2_payoffs(np.repeat(bets[None, n_layer1:], n_cases, axis=0), outcome, predictions,
+                                    role_order, self.params.observer_multiplier, self.max_bet)
+        payoffs = np.concatenate([l1_payoffs, l2_payoffs], axis=1)
+
+        probabilities = np.full(n_cases, 1 / n_cases)
+        expected = probabilities @ payoffs
+        return {
+            'expected': expected,
+            'variance': probabilities @ (payoffs - expected) ** 2,
+            'payoffs': payoffs,
+            'probabilities': probabilities,
+            'outcome': outcome,
+            'predictions': predictions,
+            'role_order': role_order,
+        }
+
     def _pi_i(self, x_i, X, i):
         """
         Calculate the individual payoff for a player based on their bet and other game parameters.
         """
+        X = np.asarray(X, dtype=float)
         mean_x = np.mean(X)
-        sum_x_over_sigma_squared = sum(x_j / player.sigma**2 for x_j, player in zip(X, self.layer1_players + self.layer2_players))
-        sum_inverse_sigma_squared = sum(1 / player.sigma**2 for player in self.layer1_players + self.layer2_players)
+        sigma = self.players.sigma
+        sum_x_over_sigma_squared = np.sum(X / sigma**2)
+        sum_inverse_sigma_squared = np.sum(1 / sigma**2)
 
         time_factor = 1 - np.tanh(self.params.alpha * self.time_constraint / 100)
-        group_benefit = (1 - np.exp(-self.params.alpha * np.sqrt(sum(X)))) * x_i * (sum_x_over_sigma_squared / sum_inverse_sigma_squared)
-        info_component = np.exp(-((x_i - mean_x) ** 2 / (2 * (self.layer1_players + self.layer2_players)[i].sigma**2)))
+        group_benefit = (1 - np.exp(-self.params.alpha * np.sqrt(np.sum(X)))) * x_i * (sum_x_over_sigma_squared / sum_inverse_sigma_squared)
+        info_component = np.exp(-((x_i - mean_x) ** 2 / (2 * sigma[i]**2)))
         risk_aversion = np.exp(-x_i / 100) * (1 - x_i / self.max_bet) ** 3  # More aggressive risk aversion
         cooperation_bonus = np.exp(-0.005 * abs(x_i - mean_x))  # Increased cooperation bonus
 
@@ -154,22 +322,22 @@ class Game:
         if i < len(self.layer1_players):
             payoff += self.params.layer1_bonus
 
-        if (self.layer1_players + self.layer2_players)[i].role == 'observer':
+        if self.players.role[i] == ROLE_NAMES.index('observer'):
             payoff *= self.params.observer_multiplier
 
         payoff -= self._cost_function(x_i)
         
-        community_alignment = 1 - abs(x_i - np.mean(X)) / np.mean(X)
+        community_alignment = 1 - abs(x_i - mean_x) / mean_x
         greed_penalty = self.params.greed_factor * np.exp(x_i / self.max_bet - 0.7) * (1 - community_alignment)
         payoff -= greed_penalty
         
         community_benefit = self.params.community_factor * community_alignment * x_i * 5  # Increased community benefit
         payoff += community_benefit
 
-        stability_bonus = self.params.stability_factor * np.exp(-0.3 * ((x_i - np.mean(X)) / 20)**2) * 2  # Increased stability bonus
+        stability_bonus = self.params.stability_factor * np.exp(-0.3 * ((x_i - mean_x) / 20)**2) * 2  # Increased stability bonus
         payoff += stability_bonus
         
-        reputation_bonus = self.params.reputation_factor * (self.layer1_players + self.layer2_players)[i].reputation * 4  # Increased reputation impact
+        reputation_bonus = self.params.reputation_factor * self.players.reputation[i] * 4  # Increased reputation impact
         payoff += reputation_bonus
 
         dynamic_base_payoff = self.params.base_payoff * (1 + 0.02 * self.community_score)  # Increased community score impact
@@ -177,9 +345,157 @@ class Game:
 
         return float(np.sum(payoff))
 
+    def payoff_vector(self, X, sigma=None):
+        """
+        Calculate every player's payoff for the bet profile X in one NumPy pass.
+
+        X is either a single profile of shape (n_players,) or a batch of shape
+        (batch, n_players). sigma optionally overrides the players' sigmas and
+        must broadcast against X. Entry i equals _pi_i(X[i], X, i).
+        """
+        X, inv_sigma_sq, mean_x, total_x, weighted_x = self._profile_aggregates(X, sigma)
+        return self._payoff_from_aggregates(X, inv_sigma_sq, mean_x, total_x, weighted_x)
+
+    def _profile_aggregates(self, X, sigma):
+        X = np.asarray(X, dtype=float)
+        if sigma is None:
+            sigma = self.players.sigma
+        inv_sigma_sq = np.broadcast_to(1 / np.asarray(sigma, dtype=float)**2, X.shape)
+
+        total_x = X.sum(axis=-1, keepdims=True)
+        mean_x = total_x / X.shape[-1]
+        weighted_x = (X * inv_sigma_sq).sum(axis=-1, keepdims=True) / inv_sigma_sq.sum(axis=-1, keepdims=True)
+        return X, inv_sigma_sq, mean_x, total_x, weighted_x
+
+    def deviation_payoffs(self, X, players, bets):
+        """
+        Payoff of each listed player for each of the given bets while the others bet X,
+        shaped (len(players), n_bets). bets is shared, shape (n_bets,), or per player,
+        shape (len(players), n_bets).
+
+        A deviation only moves the shared aggregates by the deviating bet, so they are
+        computed once for X and adjusted per deviation, in O(n_players + len(players) * len(bets))
+        rather than one payoff_vector call per deviation.
+        """
+        X = np.asarray(X, dtype=float)
+        players = np.asarray(players)
+        inv_sigma_sq = 1 / self.players.sigma**2
+        others_total = X.sum() - X[players]
+        others_weighted = X @ inv_sigma_sq - X[players] * inv_sigma_sq[players]
+
+        # Bets along the first axis and players along the last, as _payoff_from_aggregates expects
+        x = np.broadcast_to(np.asarray(bets, dtype=float), (len(players), np.shape(bets)[-1])).T
+        total_x = others_total + x
+        weighted_x = (others_weighted + x * inv_sigma_sq[players]) / inv_sigma_sq.sum()
+        payoffs = self._payoff_from_aggregates(x, inv_sigma_sq[players], total_x / len(X), total_x, weighted_x,
+                                               players=players)
+        return payoffs.T
+
+    def _player_payoff_constants(self, players=None):
+        layer1_bonus = np.where(np.arange(len(self.players)) < len(self.layer1_players), self.params.layer1_bonus, 0.0)
+        multiplier = np.where(self.players.role == ROLE_NAMES.index('observer'), self.params.observer_multiplier, 1.0)
+        if players is not None:
+            return self.players.reputation[players], layer1_bonus[players], multiplier[players]
+        return self.players.reputation, layer1_bonus, multiplier
+
+    def payoff_gradient(self, X, sigma=None):
+        """
+        Gradient of the total payoff sum(payoff_vector(X)) with respect to every bet in X.
+        """
+        X, inv_sigma_sq, partials = self._payoff_partials(X, sigma)
+        _, d_x, d_mean, d_total, d_weighted = partials
+        n = X.shape[-1]
+        return (d_x + d_mean.sum(axis=-1, keepdims=True) / n + d_total.sum(axis=-1, keepdims=True)
+                + d_weighted.sum(axis=-1, keepdims=True) * inv_sigma_sq / inv_sigma_sq.sum(axis=-1, keepdims=True))
+
+    def own_payoff_gradient(self, X, sigma=None):
+        """
+        Derivative of each player's payoff with respect to their own bet, i.e. the slope
+        of player i's best-response problem at X.
+        """
+        X, inv_sigma_sq, partials = self._payoff_partials(X, sigma)
+        _, d_x, d_mean, d_total, d_weighted = partials
+        n = X.shape[-1]
+        return d_x + d_mean / n + d_total + d_weighted * inv_sigma_sq / inv_sigma_sq.sum(axis=-1, keepdims=True)
+
+    def _payoff_partials(self, X, sigma):
+        X, inv_sigma_sq, mean_x, total_x, weighted_x = self._profile_aggregates(X, sigma)
+        partials = self._payoff_from_aggregates(X, inv_sigma_sq, mean_x, total_x, weighted_x, partials=True)
+        return X, inv_sigma_sq, partials
+
+    def _payoff_from_aggregates(self, x, inv_sigma_sq, mean_x, total_x, weighted_x, partials=False, players=None):
+        """
+        Evaluate the _pi_i payoff terms given the shared aggregates of the profile:
+        the mean bet, the total bet and the 1/sigma**2-weighted mean bet. The last axis
+        runs over all players, or over the listed players when players is given.
+
+        With partials=True, also return the partial derivatives of each payoff with
+        respect to the player's own bet (holding the aggregates fixed), the mean bet,
+        the total bet and the weighted mean bet.
+        """
+        reputation, layer1_bonus, multiplier = self._player_payoff_constants(players)
+        deviation = x - mean_x
+
+        time_factor = 1 - np.tanh(self.params.alpha * self.time_constraint / 100)
+        group_scale = 1 - np.exp(-self.params.alpha * np.sqrt(total_x))
+        group_benefit = group_scale * x * weighted_x
+        info_component = np.exp(-(deviation**2 * inv_sigma_sq / 2))
+        risk_aversion = np.exp(-x / 100) * (1 - x / self.max_bet) ** 3
+        cooperation_bonus = np.exp(-0.005 * np.abs(deviation))
+
+        payoff = self.params.base_payoff + time_factor * (group_benefit + info_component) * risk_aversion * cooperation_bonus
+        payoff = (payoff + layer1_bonus) * multiplier
+        payoff -= self._cost_function(x)
+
+        community_alignment = 1 - np.abs(deviation) / mean_x
+        greed_scale = np.exp(x / self.max_bet - 0.7)
+        community_term = self.params.community_factor * 5
+        stability_bonus = self.params.stability_factor * np.exp(-0.3 * (deviation / 20)**2) * 2
+        payoff -= self.params.greed_factor * greed_scale * (1 - community_alignment)
+        payoff += community_term * community_alignment * x
+        payoff += stability_bonus
+        payoff += self.params.reputation_factor * reputation * 4
+        payoff += self.params.base_payoff * (1 + 0.02 * self.community_score) - self.params.base_payoff
+
+        if not partials:
+            return payoff
+
+        sign = np.sign(deviation)
+        benefit = group_benefit + info_component
+        scale = time_factor * risk_aversion * cooperation_bonus
+
+        # Group benefit and info component
+        group_benefit_x = group_scale * weighted_x
+        group_benefit_total = self.params.alpha * np.exp(-self.params.alpha * np.sqrt(total_x)) / (2 * np.sqrt(total_x)) * x * weighted_x
+        group_benefit_weighted = group_scale * x
+        info_x = -deviation * inv_sigma_sq * info_component
+        # Risk aversion and cooperation bonus
+        risk_aversion_x = -risk_aversion / 100 - 3 * np.exp(-x / 100) * (1 - x / self.max_bet) ** 2 / self.max_bet
+        cooperation_x = -0.005 * sign * cooperation_bonus
+
+        core_x = (group_benefit_x + info_x) * scale + time_factor * benefit * (risk_aversion_x * cooperation_bonus + risk_aversion * cooperation_x)
+        core_mean = -info_x * scale - time_factor * benefit * risk_aversion * cooperation_x
+
+        # Greed penalty, community benefit and stability bonus
+        alignment_x = -sign / mean_x
+        alignment_mean = sign / mean_x + np.abs(deviation) / mean_x**2
+        greed_x = self.params.greed_factor * greed_scale * ((1 - community_alignment) / self.max_bet - alignment_x)
+        greed_mean = -self.params.greed_factor * greed_scale * alignment_mean
+        stability_x = -0.0015 * deviation * stability_bonus
+
+        d_x = multiplier * core_x - self._cost_derivative(x) - greed_x + community_term * (community_alignment + x * alignment_x) + stability_x
+        d_mean = multiplier * core_mean - greed_mean + community_term * x * alignment_mean - stability_x
+        d_total = multiplier * time_factor * group_benefit_total * risk_aversion * cooperation_bonus
+        d_weighted = multiplier * time_factor * group_benefit_weighted * risk_aversion * cooperation_bonus
+
+        return payoff, d_x, d_mean, d_total, d_weighted
+
     def _cost_function(self, x):
         return 0.004 * x**1.6  # Slightly more aggressive cost function
 
+    def _cost_derivative(self, x):
+        return 0.0064 * x**0.6
+
     def update_community_score(self, X):
         avg_bet = np.mean(X)
         if avg_bet <= self.max_bet / 2:
@@ -188,19 +504,22 @@ class Game:
             self.community_score -= 1  # Less aggressive decrease
         
         # Consider alignment with community average
-        alignment = 1 - np.mean([abs(bet - avg_bet) for bet in X]) / self.max_bet
+        alignment = 1 - np.mean(np.abs(np.asarray(X) - avg_bet)) / self.max_bet
         self.community_score += alignment * 2  # Reward alignment
         
         self.community_score = max(0, min(100, self.community_score))
 
     def update_reputations(self, bets, payoffs):
+        bets = np.asarray(bets, dtype=float)
+        payoffs = np.asarray(payoffs, dtype=float)
+        n = min(len(self.players), len(bets), len(payoffs))
         avg_bet = np.mean(bets)
-        for player, bet, payoff in zip(self.layer1_players + self.layer2_players, bets, payoffs):
-            bet_score = 1 - abs(bet - avg_bet) / self.max_bet
-            payoff_score = (payoff + self.max_bet) / (2 * self.max_bet)
-            reputation_change = 0.2 * (bet_score + payoff_score - 1)  # More aggressive reputation change
-            player.reputation = max(0, min(1, player.reputation + reputation_change))
+        bet_score = 1 - np.abs(bets[:n] - avg_bet) / self.max_bet
+        payoff_score = (payoffs[:n] + self.max_bet) / (2 * self.max_bet)
+        reputation_change = 0.2 * (bet_score + payoff_score - 1)  # More aggressive reputation change
+        self.players.reputation[:n] = np.clip(self.players.reputation[:n] + reputation_change, 0, 1)
 
     def update_cumulative_profits(self, payoffs):
-        for player, payoff in zip(self.layer1_players + self.layer2_players, payoffs):
-            player.update_cumulative_profit(payoff)
\ No newline at end of file
+        payoffs = np.asarray(payoffs, dtype=float)
+        n = min(len(self.players), len(payoffs))
+        self.players.cumulative_profit[:n] += payoffs[:n]
\ No newline at end of file
@@ -6,24 +6,133 @@ from plotly.subplots import make_subplots
 import pandas as pd
 from scipy import stats
 import json
+import multiprocessing
+from multiprocessing import shared_memory
 from mathematical_model import GameParameters, Game
 from nash_equilibrium_solver import analyze_equilibria
+from batched_simulation import simulate_games, stream_games, compare_parameter_sets, resolve_rng, player_counts
+from parameter_sweep import run_sweep
+from replicator_dynamics import replicator_dynamics
+from payoff_table import PayoffTable
+from streaming_stats import StreamingStats
+from result_store import ResultStore, save_results
 
 def load_config(config_file='game_config.json'):
     with open(config_file, 'r') as f:
         return json.load(f)
     
-def run_simulation(n_simulations=1000):
+def simulation_accumulators(n_layer1=2, n_layer2=3, max_bet=80):
+    """
+    Empty StreamingStats for the five run_simulation histories, in the same order.
+    Payoff histograms span the payoff range of bets up to max_bet: a layer 1 player
+    loses at most max_bet and wins at most every layer 1 bet, and layer 2 payoffs are
+    non-negative, with multiplied wins plus role bonuses binned up to 2 * max_bet.
+    """
+    n_total = n_layer1 + n_layer2
+    return (
+        StreamingStats((n_layer1,), bins=np.linspace(-max_bet, n_layer1 * max_bet, 121)),
+        StreamingStats((n_layer2,), bins=np.linspace(0, 2 * max_bet, 81)),
+        StreamingStats((), bins=np.linspace(0, 100, 101)),
+        StreamingStats((n_total,), bins=np.linspace(0, 1, 51)),
+        StreamingStats((n_total,)),
+    )
+
+HISTORY_COLUMNS = ('layer1_payoffs', 'layer2_payoffs', 'community_scores', 'reputations', 'cumulative_profits')
+TARGET_METRICS = ('layer1_profit', 'layer2_profit', 'community_score')
+
+def run_adaptive_simulation(params, precision, confidence=0.95, batch_size=10000, max_simulations=10**7, rng=None):
+    """
+    Play batches of games until the confidence intervals of the mean layer 1 profit,
+    layer 2 profit and community score per game all have a half-width of at most
+    precision (a number, or a dict keyed by TARGET_METRICS), or max_simulations games
+    have been played.
+
+    Returns the simulation accumulators and the final half-widths by metric.
+    """
+    if not isinstance(precision, dict):
+        precision = {metric: precision for metric in TARGET_METRICS}
+    if batch_size < 2 or max_simulations < 2:
+        raise ValueError(f"A confidence interval needs at least 2 games per batch and in total, got "
+                         f"batch_size={batch_size}, max_simulations={max_simulations}")
+    if any(value <= 0 for value in precision.values()):
+        raise ValueError(f"Precision must be positive, got {precision}")
+    rng = resolve_rng(rng)
+    z = stats.norm.ppf(0.5 + confidence / 2)
+    accumulators = simulation_accumulators(*player_counts(params), max_bet=params.max_bet)
+    targets = {metric: StreamingStats() for metric in TARGET_METRICS}
+
+    n_games, n_batch = 0, batch_size
+    while n_games < max_simulations:
+        n_batch = min(n_batch, max_simulations - n_games)
+        for chunk in stream_games(params, n_batch, rng=rng):
+            for accumulator, values in zip(accumulators, chunk):
+                accumulator.update(values)
+            layer1_payoffs, layer2_payoffs, community_scores = chunk[:3]
+            targets['layer1_profit'].update(layer1_payoffs.sum(axis=1))
+            targets['layer2_profit'].update(layer2_payoffs.sum(axis=1))
+            targets['community_score'].update(community_scores)
+        n_games += n_batch
+
+        half_widths = {metric: float(z * target.std(ddof=1) / np.sqrt(target.count)) for metric, target in targets.items()}
+        if all(half_widths[metric] <= precision[metric] for metric in precision):
+            break
+        # Half-widths shrink as 1/sqrt(n): jump most of the way to the projected sample size
+        shortfall = max((half_widths[metric] / precision[metric]) ** 2 for metric in precision)
+        n_batch = max(batch_size, int(0.9 * n_games * (shortfall - 1)))
+
+    print(f"Adaptive simulation used {n_games} games; {confidence:.0%} CI half-widths: "
+          + ", ".join(f"{metric} = {half_width:.4f}" for metric, half_width in half_widths.items()))
+    return accumulators, half_widths
+
+def run_simulation(n_simulations=1000, engine="batched", rng=None, accumulate=False, store=None,
+                   param_set_id="simulation", run_id=0, precision=None):
+    """
+    With accumulate=True, results are collected into constant-memory StreamingStats
+    accumulators (see simulation_accumulators) instead of per-game histories. Given a
+    ResultStore, the batched engine replaces run run_id of param_set_id with the
+    histories, appended chunk by chunk under HISTORY_COLUMNS, and returns them as
+    memory maps. Given a precision, the batched engine plays as many games as
+    run_adaptive_simulation needs instead of n_simulations, and returns the
+    accumulators.
+    """
     params = GameParameters(greed_factor=0.15, group_factor=0.2, community_factor=0.35, stability_factor=0.25, max_bet=80, base_payoff=20, layer1_bonus=10)
+    if engine == "batched":
+        if precision is not None:
+            return run_adaptive_simulation(params, precision, rng=rng)[0]
+        # Each game is a fresh Game played for one round, so all games can be drawn and settled as arrays
+        if store is not None:
+            # Replace any earlier histories of this run rather than appending to them
+            store.remove(param_set_id, run_id)
+            for chunk in stream_games(params, n_simulations, rng=rng):
+                for column, values in zip(HISTORY_COLUMNS, chunk):
+                    store.append(param_set_id, run_id, column, values)
+            return tuple(store.read(param_set_id, run_id, column) for column in HISTORY_COLUMNS)
+        if not accumulate:
+            return simulate_games(params, n_simulations, rng=rng)
+        accumulators = simulation_accumulators(*player_counts(params), max_bet=params.max_bet)
+        for chunk in stream_games(params, n_simulations, rng=rng):
+            for accumulator, values in zip(accumulators, chunk):
+                accumulator.update(values)
+        return accumulators
+    if engine != "object":
+        raise ValueError(f"Unknown simulation engine: {engine}")
+    if accumulate:
+        accumulators = simulation_accumulators(*player_counts(params), max_bet=params.max_bet)
+        for _ in range(n_simulations):
+            for accumulator, values in zip(accumulators, run_simulation(1, engine="object", rng=rng)):
+                accumulator.update(values)
+        return accumulators
+
     layer1_payoff_results = []
     layer2_payoff_results = []
     community_score_history = []
     reputation_history = []
     cumulative_profit_history = []
 
+    random = np.random if rng is None else rng
     for _ in range(n_simulations):
-        time_constraint = np.random.uniform(10, 100)  # Random time constraint for each game
-        game = Game(params, time_constraint)
+        time_constraint = random.uniform(10, 100)  # Random time constraint for each game
+        game = Game(params, time_constraint, rng=rng)
         layer1_payoffs, layer2_payoffs = game.run_game()
         layer1_payoff_results.append(layer1_payoffs)
         layer2_payoff_results.append(layer2_payoffs)
@@ -55,6 +164,10 @@ def run_analysis(params, time_constraint):
         print(f"Base payoff: {params.base_payoff}")
         print(f"Community score: {game.community_score}")
         print(f"Player reputations: {[player.reputation for player in game.layer1_players + game.layer2_players]}")
+        # Exact over the round's outcomes, predictions and roles, rather than the single sampled round above
+        expected = game.expected_round_payoffs(ne)
+        print(f"Expected payoffs at the Nash equilibrium bets: {expected['expected']}")
+        print(f"Payoff standard deviations: {np.sqrt(expected['variance'])}")
         print()
 
         return ne, bne, cbne, sum(layer1_payoffs), sum(layer2_payoffs), game.community_score
@@ -64,48 +177,179 @@ def run_analysis(params, time_constraint):
         print()
         return None, None, None, None, None, None
 
-def run_evolutionary_simulation(params, time_constraint, num_generations=10):
-    population_size = 1000
-    population = np.random.rand(params.n_players, population_size) * params.max_bet  # Initialize with random strategies between 0 and max_bet
-
-    game = Game(params, time_constraint)
+def population_fitness(game, population, table=None):
+    """
+    Fitness of every individual in population (n_players x population_size): the total
+    payoff of its strategy vector played as the bets, plus the community alignment bonus.
+    Payoffs are interpolated from table when a PayoffTable for game is given.
+    """
+    params = game.params
+    payoffs = (game.payoff_vector(population.T) if table is None else table.payoffs(population.T)).sum(axis=1)
+    mean_bets = population.mean(axis=0)
+    community_alignment = 1 - np.mean(np.abs(population - mean_bets) / mean_bets, axis=0)
+    return np.maximum(0, payoffs + params.community_factor * community_alignment * mean_bets * 5)
+
+def _crossover(population, n_pairs=100):
+    # Swap the first crossover_point strategies between disjoint pairs of individuals
+    n_players, population_size = population.shape
+    n_pairs = min(n_pairs, population_size // 2)
+    parents = np.random.permutation(population_size)[:2 * n_pairs].reshape(2, n_pairs)
+    crossover_points = np.random.randint(0, n_players, n_pairs)
+    swap = np.arange(n_players)[:, None] < crossover_points
+    first, second = population[:, parents[0]], population[:, parents[1]]
+    population[:, parents[0]] = np.where(swap, second, first)
+    population[:, parents[1]] = np.where(swap, first, second)
+    return population
+
+def _evolve_generation(game, population, table=None):
+    """
+    One generation of fitness-proportional selection, Gaussian mutation and crossover.
+    Returns the new population and the fitnesses of the old one; raises ValueError if
+    selection is impossible because no individual has positive fitness.
+    """
+    params = game.params
+    population_size = population.shape[1]
+    fitnesses = population_fitness(game, population, table)
+    selected_indices = np.random.choice(population_size, population_size, p=fitnesses / fitnesses.sum())
+    population = population[:, selected_indices]
+
+    population += np.random.normal(0, 1, population.shape)
+    population = np.clip(population, 0, params.max_bet)
+    return _crossover(population), fitnesses
+
+def _nash_reference(game, use_cache=True, cache=None):
+    params = game.params
     type_distributions = [[0.7, 0.3] for _ in range(params.n_players)]
-    ne, _, _ = analyze_equilibria(game, type_distributions)
+    ne, _, _ = analyze_equilibria(game, type_distributions, use_cache=use_cache, cache=cache)
 
     if ne is None:
         print("Failed to solve for Nash Equilibrium. Using random initial guess.")
         ne = np.random.rand(params.n_players) * params.max_bet
+    return ne
+
+def _island_worker(island, game, population, num_generations, migration_interval, n_migrants, shm_name, barrier, seed):
+    """
+    Evolve one island, writing its average strategy per generation to the shared history
+    and exchanging its fittest individuals with the neighbouring islands of a ring.
+    """
+    np.random.seed(seed)
+    n_islands = barrier.parties
+    n_players, population_size = population.shape
+    shm = shared_memory.SharedMemory(name=shm_name)
+    migrants = history = None
+    try:
+        migrants = np.ndarray((n_islands, n_players, n_migrants), buffer=shm.buf)
+        history = np.ndarray((n_islands, num_generations, n_players), buffer=shm.buf, offset=migrants.nbytes)
+
+        for generation in range(num_generations):
+            try:
+                population, _ = _evolve_generation(game, population)
+            except ValueError:
+                population = np.random.rand(n_players, population_size) * 10 + population
+            history[island, generation] = population.mean(axis=1)
+
+            if (generation + 1) % migration_interval == 0 and generation + 1 < num_generations:
+                order = np.argsort(population_fitness(game, population))
+                migrants[island] = population[:, order[-n_migrants:]]
+                barrier.wait()
+                # Immigrants from the previous island replace the least fit individuals
+                population[:, order[:n_migrants]] = migrants[(island - 1) % n_islands]
+                barrier.wait()
+    except BaseException:
+        # Release the other islands from the barrier instead of leaving them waiting
+        barrier.abort()
+        raise
+    finally:
+        del migrants, history
+        shm.close()
+
+def run_island_simulation(params, time_constraint, num_generations=10, n_islands=4, population_size=1000,
+                          migration_interval=5, n_migrants=10, use_cache=True, cache=None):
+    """
+    Island-model evolutionary search: n_islands populations of population_size evolve in
+    separate processes and, every migration_interval generations, send their n_migrants
+    fittest individuals around a ring through a shared-memory buffer.
+
+    Returns the global average strategy history, the global Nash distance history and
+    the per-island Nash distance history of shape (n_islands, num_generations).
+    use_cache and cache are passed to analyze_equilibria for the Nash reference.
+    """
+    game = Game(params, time_constraint)
+    ne = _nash_reference(game, use_cache, cache)
+    n_migrants = min(n_migrants, population_size)
+
+    migrants_nbytes = n_islands * params.n_players * n_migrants * 8
+    history_shape = (n_islands, num_generations, params.n_players)
+    shm = shared_memory.SharedMemory(create=True, size=migrants_nbytes + int(np.prod(history_shape)) * 8)
+    try:
+        barrier = multiprocessing.Barrier(n_islands)
+        seeds = np.random.randint(0, 2 ** 31 - 1, n_islands)
+        processes = [
+            multiprocessing.Process(target=_island_worker, args=(
+                island, game, np.random.rand(params.n_players, population_size) * params.max_bet,
+                num_generations, migration_interval, n_migrants, shm.name, barrier, seeds[island]))
+            for island in range(n_islands)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        if any(process.exitcode != 0 for process in processes):
+            raise RuntimeError("An island process failed")
+
+        island_avg_strategies = np.ndarray(history_shape, buffer=shm.buf, offset=migrants_nbytes).copy()
+    finally:
+        shm.close()
+        shm.unlink()
+
+    island_nash_distance_history = np.linalg.norm(island_avg_strategies - ne, axis=2)
+    # Islands have equal sizes, so the global average strategy is the mean of the island averages
+    avg_strategy_history = island_avg_strategies.mean(axis=0)
+    nash_distance_history = np.linalg.norm(avg_strategy_history - ne, axis=1)
+
+    for island, distances in enumerate(island_nash_distance_history):
+        print(f"Island {island}: final distance from Nash: {distances[-1]}")
+    print(f"Global final average strategy after {num_generations} generations: {avg_strategy_history[-1]}")
+    print(f"Global final distance from Nash: {nash_distance_history[-1]}")
+
+    return avg_strategy_history, nash_distance_history, island_nash_distance_history
+
+def run_evolutionary_simulation(params, time_constraint, num_generations=10, n_islands=1, engine="population",
+                                use_payoff_table=False):
+    if engine == "replicator":
+        # Deterministic replicator dynamics over a bet grid instead of a sampled population
+        game = Game(params, time_constraint)
+        avg_strategy_history, nash_distance_history = replicator_dynamics(game, _nash_reference(game), num_generations)
+        print(f"Final average strategy after {num_generations} generations: {avg_strategy_history[-1]}")
+        return avg_strategy_history, nash_distance_history
+    if engine != "population":
+        raise ValueError(f"Unknown evolutionary engine: {engine}")
+
+    if n_islands > 1:
+        avg_strategy_history, nash_distance_history, _ = run_island_simulation(
+            params, time_constraint, num_generations, n_islands=n_islands)
+        return avg_strategy_history, nash_distance_history
+
+    population_size = 1000
+    population = np.random.rand(params.n_players, population_size) * params.max_bet  # Initialize with random strategies between 0 and max_bet
+
+    game = Game(params, time_constraint)
+    ne = _nash_reference(game)
+    table = PayoffTable(game) if use_payoff_table else None
 
     avg_strategy_history = []
     fitness_history = []
     nash_distance_history = []
 
     for generation in range(num_generations):
-        fitnesses = np.zeros(population_size)
-        for i in range(population_size):
-            game = Game(params, time_constraint)
-            layer1_payoffs, layer2_payoffs = game.run_game()  # This will set random bets and calculate payoffs
-            community_alignment = 1 - np.mean(abs(population[:, i] - np.mean(population[:, i])) / np.mean(population[:, i]))
-            fitnesses[i] = max(0, sum(layer1_payoffs) + sum(layer2_payoffs) + params.community_factor * community_alignment * np.mean(population[:, i]) * 5)
-
         try:
-            selected_indices = np.random.choice(population_size, population_size, p=fitnesses / fitnesses.sum())
-            population = population[:, selected_indices]
+            population, fitnesses = _evolve_generation(game, population, table)
         except ValueError as e:
             print(f"Error in selection: {e}")
             print("Adjusting population.")
             population = np.random.rand(params.n_players, population_size) * 10 + population
             continue
 
-        population += np.random.normal(0, 1, population.shape)
-        population = np.clip(population, 0, params.max_bet)
-
-        for _ in range(100):
-            parents = np.random.choice(population_size, 2, replace=False)
-            crossover_point = np.random.randint(0, params.n_players)
-            population[:crossover_point, parents[0]], population[:crossover_point, parents[1]] = \
-                population[:crossover_point, parents[1]], population[:crossover_point, parents[0]]
-
         avg_strategy = population.mean(axis=1)
         avg_strategy_history.append(avg_strategy)
         fitness_history.append(fitnesses.mean())
@@ -265,12 +509,9 @@ if __name__ == "__main__":
     
     # Run the general simulation
     print("Running general simulation:")
-    layer1_payoff_results, layer2_payoff_results, community_score_history, reputation_history, cumulative_profit_history = run_simulation()
-    avg_layer1_payoffs = np.mean(layer1_payoff_results, axis=0)
-    avg_layer2_payoffs = np.mean(layer2_payoff_results, axis=0)
-    avg_community_score = np.mean(community_score_history)
-    avg_reputations = np.mean(reputation_history, axis=0)
-    avg_cumulative_profits = np.mean(cumulative_profit_history, axis=0)
+    accumulators = run_simulation(accumulate=True, precision=0.5)
+    avg_layer1_payoffs, avg_layer2_payoffs, avg_community_score, avg_reputations, avg_cumulative_profits = \
+        [accumulator.mean for accumulator in accumulators]
 
     print(f"Average Layer 1 Payoffs: {avg_layer1_payoffs}")
     print(f"Average Layer 2 Payoffs: {avg_layer2_payoffs}")
@@ -279,27 +520,18 @@ if __name__ == "__main__":
     print(f"Average Cumulative Profits: {avg_cumulative_profits}")
     print("\n" + "=" * 50 + "\n")
 
-    # Analyze specific parameter sets
-    results = []
-    for params in parameter_sets:
-        game_params = GameParameters(**params['game_parameters'])
-        time_constraint = params['time_constraint']
-
-        print("Running single game analysis:")
-        ne, bne, cbne, layer1_profit, layer2_profit, community_score = run_analysis(game_params, time_constraint)
-        print("\nRunning evolutionary simulation:")
-        avg_strategy_history, nash_distance_history = run_evolutionary_simulation(game_params, time_constraint)
-        results.append({
-            "ne": ne,
-            "bne": bne,
-            "cbne": cbne,
-            "layer1_profit": layer1_profit,
-            "layer2_profit": layer2_profit,
-            "avg_strategy_history": avg_strategy_history,
-            "nash_distance_history": nash_distance_history,
-            "community_score": community_score,
-        })
-        print("\n" + "=" * 50 + "\n")
+    # Analyze every point of the parameter grids, resuming from earlier checkpoints
+    parameter_sets, results = run_sweep(parameter_sets)
+    # Keep the raw histories on disk so they can be re-analysed with result_store.load_results
+    save_results(ResultStore('results'), parameter_sets, results)
+    print("\n" + "=" * 50 + "\n")
+
+    # Common random numbers let every set play the same games, so differences resolve quickly
+    print("Comparing parameter sets with common random numbers:")
+    comparison = compare_parameter_sets([GameParameters(**point['game_parameters']) for point in parameter_sets], 100000)
+    for i, (difference, std_error) in enumerate(zip(comparison['differences'][1:], comparison['std_errors'][1:]), 2):
+        print(f"Set {i} vs set 1: total profit difference per game = {difference[2]:.3f} +/- {1.96 * std_error[2]:.3f}")
+    print()
 
     visualize_results(parameter_sets, results)
     statistical_analysis(results)
\ No newline at end of file
@@ -1,14 +1,42 @@
+import copy
+import multiprocessing
+import queue
+import time
 import numpy as np
-from scipy.optimize import minimize, differential_evolution
-from typing import List, Tuple
-from mathematical_model import Game, GameParameters
+from itertools import combinations_with_replacement
+from scipy.optimize import minimize, differential_evolution, OptimizeResult
+from scipy.special import gammaln, xlogy
+from scipy.stats import qmc
+from typing import List, Optional, Tuple
+from mathematical_model import Game, GameParameters, PlayerTable, ROLE_NAMES
+from equilibrium_cache import EquilibriumCache, default_cache
+
+# Bump whenever a change to the solvers can change their results, so cached equilibria are recomputed
+SOLVER_VERSION = 3
 
 def objective(X: np.ndarray, game: Game) -> float:
-    return -sum(game._pi_i(X[i], X, i) for i in range(len(game.layer1_players + game.layer2_players)))
+    return -float(np.sum(game.payoff_vector(X)))
 
-def solve_nash_equilibrium(game: Game) -> np.ndarray:
-    initial_guess = np.ones(len(game.layer1_players + game.layer2_players)) * (game.max_bet / 2)
-    bounds = [(0, game.max_bet) for _ in range(len(game.layer1_players + game.layer2_players))]
+def objective_gradient(X: np.ndarray, game: Game) -> np.ndarray:
+    return -game.payoff_gradient(X)
+
+def batch_objective(X: np.ndarray, game: Game) -> np.ndarray:
+    return -game.payoff_vector(X).sum(axis=-1)
+
+def _vectorized_objective(X: np.ndarray, game: Game) -> np.ndarray:
+    # differential_evolution(vectorized=True) passes candidates as the columns of X
+    return batch_objective(X.T, game)
+
+def solve_nash_equilibrium(game: Game, initial_guess: Optional[np.ndarray] = None, return_info: bool = False):
+    """
+    Starts from initial_guess, or max_bet / 2 for every player. return_info=True also
+    returns a dict with the successful method and the objective evaluations used.
+    """
+    n_players = len(game.layer1_players + game.layer2_players)
+    default = np.ones(n_players) * (game.max_bet / 2)
+    initial_guess = default if initial_guess is None else np.clip(np.asarray(initial_guess, dtype=float), 0, game.max_bet)
+    bounds = [(0, game.max_bet) for _ in range(n_players)]
+    info = {"method": None, "nfev": 0}
 
     methods = ['L-BFGS-B', 'SLSQP', 'TNC']
     
@@ -19,163 +47,742 @@ def solve_nash_equilibrium(game: Game) -> np.ndarray:
                 initial_guess,
                 args=(game,),
                 method=method,
+                jac=objective_gradient,
                 bounds=bounds,
                 options={"ftol": 1e-6, "maxiter": 1000},
             )
+            info["nfev"] += int(result.nfev)
             
             if result.success:
-                return result.x
+                info["method"] = method
+                return (result.x, info) if return_info else result.x
         except Exception as e:
             print(f"Method {method} failed: {str(e)}")
     
     # If all methods fail, try differential evolution
     try:
         result = differential_evolution(objective, bounds, args=(game,), maxiter=1000, tol=1e-6)
+        info["nfev"] += int(result.nfev)
         if result.success:
-            return result.x
+            info["method"] = "differential_evolution"
+            return (result.x, info) if return_info else result.x
     except Exception as e:
         print(f"Differential evolution failed: {str(e)}")
     
     # If all optimization methods fail, return a default strategy
     print("Warning: Failed to find Nash equilibrium. Returning default strategy.")
-    return np.ones(len(game.layer1_players + game.layer2_players)) * (game.max_bet / 2)
+    return (default, info) if return_info else default
+
+def _portfolio_attempt(game: Game, method: str, initial_guess: Optional[np.ndarray], seed: Optional[int]) -> dict:
+    start = time.perf_counter()
+    bounds = [(0, game.max_bet) for _ in range(len(game.layer1_players + game.layer2_players))]
+    try:
+        if method == "differential_evolution":
+            result = differential_evolution(_vectorized_objective, bounds, args=(game,), maxiter=1000, tol=1e-6,
+                                            vectorized=True, updating="deferred", seed=seed)
+        else:
+            result = minimize(objective, initial_guess, args=(game,), method=method, jac=objective_gradient,
+                              bounds=bounds, options={"ftol": 1e-6, "maxiter": 1000})
+        outcome = {"x": result.x, "fun": float(result.fun), "success": bool(result.success),
+                   "nfev": int(result.nfev), "message": str(result.message)}
+    except Exception as e:
+        outcome = {"x": None, "fun": np.inf, "success": False, "nfev": 0, "message": str(e)}
+    outcome.update(method=method, initial_guess=initial_guess, time=time.perf_counter() - start)
+    return outcome
 
-def is_nash_equilibrium(game: Game, X: np.ndarray, epsilon: float = 1e-6) -> bool:
-    for i in range(len(game.layer1_players + game.layer2_players)):
-        def f(x):
-            X_copy = X.copy()
-            X_copy[i] = x
-            return -game._pi_i(x, X_copy, i)
+def solve_nash_equilibrium_portfolio(game: Game, methods: Tuple[str, ...] = ('L-BFGS-B', 'SLSQP', 'TNC'),
+                                     n_starts: int = 4, include_global: bool = True,
+                                     max_exploitability: Optional[float] = None,
+                                     max_workers: Optional[int] = None, seed: Optional[int] = None) -> OptimizeResult:
+    """
+    Run the local methods from n_starts starting points (max_bet / 2 plus random
+    points) and a vectorized differential_evolution concurrently in a process pool.
+    The first attempt that succeeds, and whose exploitability is at most
+    max_exploitability if given, is accepted and the remaining attempts are terminated.
+    If none qualifies, the successful attempt with the best objective is returned.
 
-        res = minimize(f, X[i], method="L-BFGS-B", bounds=[(0, game.max_bet)])
-        if game._pi_i(res.x[0], X, i) > game._pi_i(X[i], X, i) + epsilon:
-            return False
-    return True
+    The result holds the chosen method, every finished attempt with its own timing, and
+    the total wall time.
+    """
+    n_players = len(game.layer1_players + game.layer2_players)
+    rng = np.random.default_rng(seed)
+    starts = [np.ones(n_players) * (game.max_bet / 2)] + [rng.uniform(0, game.max_bet, n_players) for _ in range(n_starts - 1)]
+    tasks = [(method, start, None) for start in starts for method in methods]
+    if include_global:
+        tasks.append(("differential_evolution", None, seed))
+
+    started = time.perf_counter()
+    finished = queue.Queue()
+    attempts, accepted = [], None
+    with multiprocessing.Pool(max_workers) as pool:
+        for method, start, task_seed in tasks:
+            # Failures outside _portfolio_attempt (pickling, a killed worker) still report an attempt
+            failed = lambda e, method=method, start=start: finished.put(
+                {"x": None, "fun": np.inf, "success": False, "nfev": 0, "message": f"{type(e).__name__}: {e}",
+                 "method": method, "initial_guess": start, "time": 0.0})
+            pool.apply_async(_portfolio_attempt, (game, method, start, task_seed), callback=finished.put,
+                             error_callback=failed)
+        for _ in tasks:
+            attempt = finished.get()
+            attempts.append(attempt)
+            if not attempt["success"]:
+                continue
+            if max_exploitability is None or nash_regrets(game, attempt["x"]).sum() <= max_exploitability:
+                accepted = attempt
+                break
+    # Leaving the pool context terminates any attempts still running
+
+    if accepted is None:
+        successful = [attempt for attempt in attempts if attempt["success"]]
+        accepted = min(successful, key=lambda attempt: attempt["fun"]) if successful else None
+
+    if accepted is None:
+        x, method, fun = np.ones(n_players) * (game.max_bet / 2), None, objective(np.ones(n_players) * (game.max_bet / 2), game)
+    else:
+        x, method, fun = accepted["x"], accepted["method"], accepted["fun"]
+    return OptimizeResult(x=x, fun=fun, method=method, success=accepted is not None, attempts=attempts,
+                          wall_time=time.perf_counter() - started)
+
+def _game_at(game: Game, parameter: str, value: float) -> Game:
+    # A shallow copy of game, sharing its players, with one parameter changed
+    point = copy.copy(game)
+    if parameter == "time_constraint":
+        point.time_constraint = value
+        return point
+    if not hasattr(game.params, parameter):
+        raise ValueError(f"Unknown game parameter: {parameter}")
+    point.params = copy.copy(game.params)
+    setattr(point.params, parameter, value)
+    if parameter == "max_bet":
+        point.max_bet = value
+    return point
+
+def solve_continuation(game: Game, parameter: str, values, solver: str = "nash",
+                       type_distributions: Optional[List[List[float]]] = None, warm_start: bool = True,
+                       extrapolate: bool = True, jump_tol: Optional[float] = None) -> OptimizeResult:
+    """
+    Equilibria along values of one parameter, each solve warm-started from the previous
+    solutions. Solutions further than jump_tol from the prediction are reported as jumps.
+    """
+    values = np.asarray(values, dtype=float)
+    jump_tol = game.max_bet / 10 if jump_tol is None else jump_tol
+    solutions, nfev, jumps = [], [], []
+
+    for k, value in enumerate(values):
+        point = _game_at(game, parameter, value)
+        guess = None
+        if warm_start and k >= 1:
+            guess = solutions[-1]
+            if extrapolate and k >= 2 and values[k - 1] != values[k - 2]:
+                slope = (solutions[-1] - solutions[-2]) / (values[k - 1] - values[k - 2])
+                guess = guess + slope * (value - values[k - 1])
+            guess = np.clip(guess, 0, point.max_bet)
+
+        if solver == "nash":
+            x, info = solve_nash_equilibrium(point, initial_guess=guess, return_info=True)
+        elif solver == "bayesian":
+            x, info = solve_bayesian_nash_equilibrium(point, type_distributions, initial_guess=guess, return_info=True)
+        else:
+            raise ValueError(f"Unknown continuation solver: {solver}")
+
+        if guess is not None and np.max(np.abs(x - guess)) > jump_tol:
+            jumps.append(k)
+            print(f"Continuation: possible branch jump at {parameter}={value:g}, "
+                  f"{np.max(np.abs(x - guess)):.3f} from the predicted solution")
+        solutions.append(x)
+        nfev.append(info["nfev"])
+
+    return OptimizeResult(values=values, x=np.array(solutions), nfev=np.array(nfev),
+                          total_nfev=int(np.sum(nfev)), jumps=jumps)
+
+def _deviation_objective(x: np.ndarray, game: Game, X: np.ndarray, i: int) -> Tuple[float, np.ndarray]:
+    X_copy = np.array(X, dtype=float)
+    X_copy[i] = x[0]
+    return -game.payoff_vector(X_copy)[i], -game.own_payoff_gradient(X_copy)[i:i + 1]
+
+def is_nash_equilibrium(game: Game, X: np.ndarray, epsilon: float = 1e-6, grid_size: int = 65,
+                        max_workers: Optional[int] = None, table=None) -> bool:
+    return bool(np.all(nash_regrets(game, X, grid_size=grid_size, max_workers=max_workers, table=table) <= epsilon))
+
+def best_responses(game: Game, X: np.ndarray, players: Optional[List[int]] = None,
+                   grid_size: int = 65, polish: bool = True, screen: bool = False,
+                   table=None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Best response of each listed player to the others' bets in X, and its payoff.
+
+    All deviations are first screened on a grid of grid_size bets from 0 to max_bet in
+    a single batched evaluation of Game.deviation_payoffs; with polish=True each player's best grid point
+    is then refined by L-BFGS-B between its neighbouring grid points. With screen=True
+    only players whose best grid payoff, plus the largest payoff change between adjacent
+    grid points, reaches their current payoff are polished.
+
+    Given a PayoffTable for game, the screen is a table lookup on the table's grid
+    instead, and the payoffs of the chosen grid points are then evaluated exactly.
+    """
+    X = np.asarray(X, dtype=float)
+    players = np.arange(len(X)) if players is None else np.asarray(players)
+    if table is not None:
+        grid = table.grid
+        payoffs = table.deviation_payoffs(X, players)
+    else:
+        grid = np.linspace(0, game.max_bet, grid_size)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            payoffs = game.deviation_payoffs(X, players, grid)
+        payoffs = np.where(np.isnan(payoffs), -np.inf, payoffs)
+    grid_size = len(grid)
+
+    best = payoffs.argmax(axis=1)
+    responses = grid[best]
+    values = payoffs[np.arange(len(players)), best]
+    if table is not None:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            values = game.deviation_payoffs(X, players, responses[:, None])[:, 0]
+
+    if polish:
+        promising = np.ones(len(players), dtype=bool)
+        if screen:
+            promising = values + _grid_variation(payoffs) >= game.payoff_vector(X)[players]
+        for j, i in enumerate(players):
+            if not promising[j]:
+                continue
+            bounds = [(grid[max(best[j] - 1, 0)], grid[min(best[j] + 1, grid_size - 1)])]
+            res = minimize(_deviation_objective, [responses[j]], args=(game, X, i), jac=True, method="L-BFGS-B", bounds=bounds)
+            if -res.fun > values[j]:
+                responses[j], values[j] = res.x[0], -res.fun
+
+    return responses, values
+
+def _grid_variation(values: np.ndarray) -> np.ndarray:
+    steps = np.abs(np.diff(values, axis=-1))
+    return np.max(np.where(np.isfinite(steps), steps, 0), axis=-1)
+
+def _best_response_values(game: Game, X: np.ndarray, players: np.ndarray, grid_size: int, table=None) -> np.ndarray:
+    return best_responses(game, X, players, grid_size=grid_size, screen=True, table=table)[1]
+
+def nash_regrets(game: Game, X: np.ndarray, grid_size: int = 65, max_workers: Optional[int] = None,
+                 table=None) -> np.ndarray:
+    """
+    Per-player regret: how much each player could gain by deviating unilaterally from X.
+
+    Deviations are screened on a bet grid, or looked up in a PayoffTable, and only
+    promising candidates are polished (see best_responses). With max_workers > 1 the
+    players are split across a process pool.
+    """
+    X = np.asarray(X, dtype=float)
+    players = np.arange(len(X))
+    if max_workers is not None and max_workers > 1:
+        chunks = [chunk for chunk in np.array_split(players, max_workers) if len(chunk)]
+        with multiprocessing.Pool(len(chunks)) as pool:
+            values = np.concatenate(pool.starmap(_best_response_values, [(game, X, chunk, grid_size, table) for chunk in chunks]))
+    else:
+        values = _best_response_values(game, X, players, grid_size, table)
+    return np.maximum(values - game.payoff_vector(X), 0)
+
+def solve_nash_equilibrium_best_response(game: Game, update: str = "gauss-seidel", damping: float = 0.0,
+                                         tol: float = 1e-6, max_iter: int = 200, grid_size: int = 65,
+                                         initial_guess: Optional[np.ndarray] = None, table=None) -> OptimizeResult:
+    """
+    Find a Nash equilibrium by iterated best responses. update="gauss-seidel" moves one
+    player at a time against the latest bets; update="jacobi" moves all players at once,
+    evaluating every best response in the same batched grid screen. Each update is
+    damped as damping * old + (1 - damping) * response, and iteration stops once no bet
+    moves by more than tol. The result carries per-player regrets and their sum, the
+    exploitability of the returned profile. Given a PayoffTable, best responses are
+    screened by table lookup.
+    """
+    if max_iter < 1:
+        raise ValueError(f"max_iter must be at least 1, got {max_iter}")
+    n_players = len(game.layer1_players + game.layer2_players)
+    X = np.ones(n_players) * (game.max_bet / 2) if initial_guess is None else np.array(initial_guess, dtype=float)
+
+    for iteration in range(1, max_iter + 1):
+        if update == "jacobi":
+            responses, _ = best_responses(game, X, grid_size=grid_size, table=table)
+            X_new = damping * X + (1 - damping) * responses
+        elif update == "gauss-seidel":
+            X_new = X.copy()
+            for i in range(n_players):
+                response, _ = best_responses(game, X_new, [i], grid_size=grid_size, table=table)
+                X_new[i] = damping * X_new[i] + (1 - damping) * response[0]
+        else:
+            raise ValueError(f"Unknown best-response update: {update}")
+
+        step = np.max(np.abs(X_new - X))
+        X = X_new
+        if step < tol:
+            break
+
+    regrets = nash_regrets(game, X, grid_size=grid_size, table=table)
+    return OptimizeResult(x=X, regrets=regrets, exploitability=float(regrets.sum()),
+                          nit=iteration, success=bool(step < tol))
+
+def _representative_game(game: Game, sigma: np.ndarray, reputation: np.ndarray) -> Game:
+    # A shallow copy of game whose players are its layer 1 players followed by one
+    # observer per type, so the payoff kernel sees each type's sigma, reputation and role
+    representative = copy.copy(game)
+    observers = PlayerTable(len(sigma))
+    observers.role[:] = ROLE_NAMES.index('observer')
+    observers.sigma[:] = sigma
+    observers.reputation[:] = reputation
+    representative.players = PlayerTable.concatenate([PlayerTable.from_players(game.layer1_players), observers])
+    representative._bind_players(len(game.layer1_players))
+    return representative
+
+def _aggregate_best_responses(game: Game, mean_x: float, weighted_x: float, n_players: int,
+                              grid: np.ndarray, bisection_steps: int = 40) -> np.ndarray:
+    # Every player's best bet against fixed aggregates: a grid screen refined by bisection
+    inv_sigma_sq = 1 / game.players.sigma**2
+    aggregates = (mean_x, mean_x * n_players, weighted_x)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        payoffs = game._payoff_from_aggregates(grid[:, None], inv_sigma_sq, *aggregates)
+    best = np.where(np.isnan(payoffs), -np.inf, payoffs).argmax(axis=0)
+    low, high = grid[np.maximum(best - 1, 0)], grid[np.minimum(best + 1, len(grid) - 1)]
+    responses = grid[best]
+
+    def slope(x):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return game._payoff_from_aggregates(x, inv_sigma_sq, *aggregates, partials=True)[1]
+
+    # Only brackets with an interior maximum (rising at the low end, falling at the high end) are refined
+    bracketed = (slope(low) > 0) & (slope(high) < 0)
+    for _ in range(bisection_steps):
+        middle = (low + high) / 2
+        rising = slope(middle) > 0
+        low, high = np.where(rising, middle, low), np.where(rising, high, middle)
+    refined = (low + high) / 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        improves = game._payoff_from_aggregates(refined, inv_sigma_sq, *aggregates) >= \
+            game._payoff_from_aggregates(responses, inv_sigma_sq, *aggregates)
+    return np.where(bracketed & improves, refined, responses)
+
+def _aggregate_regrets(game: Game, bets: np.ndarray, responses: np.ndarray, mean_x: float, weighted_x: float,
+                       n_players: int) -> np.ndarray:
+    inv_sigma_sq = 1 / game.players.sigma**2
+    aggregates = (mean_x, mean_x * n_players, weighted_x)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        gains = (game._payoff_from_aggregates(responses, inv_sigma_sq, *aggregates)
+                 - game._payoff_from_aggregates(bets, inv_sigma_sq, *aggregates))
+    return np.maximum(np.nan_to_num(gains, nan=0.0), 0)
+
+def solve_mean_field_equilibrium(game: Game, sigma: Optional[np.ndarray] = None,
+                                 reputation: Optional[np.ndarray] = None, weights: Optional[np.ndarray] = None,
+                                 n_nodes: int = 16, n_observers: Optional[int] = None, damping: float = 0.5,
+                                 tol: float = 1e-6, max_iter: int = 500, grid_size: int = 65) -> OptimizeResult:
+    """
+    Mean-field equilibrium: observer types (by default Gauss-Legendre nodes of Game's
+    sigma distribution) and layer 1 players best-respond to the bet aggregates.
+    """
+    if sigma is None:
+        nodes, node_weights = np.polynomial.legendre.leggauss(n_nodes)
+        sigma, weights = 1 + nodes / 2, node_weights / 2
+    sigma = np.asarray(sigma, dtype=float)
+    weights = np.full(len(sigma), 1 / len(sigma)) if weights is None else np.asarray(weights, dtype=float) / np.sum(weights)
+    reputation = np.broadcast_to(0.5 if reputation is None else np.asarray(reputation, dtype=float), sigma.shape)
+    n_layer1 = len(game.layer1_players)
+    n_observers = len(game.layer2_players) if n_observers is None else n_observers
+    n_players = n_layer1 + n_observers
+
+    representative = _representative_game(game, sigma, reputation)
+    inv_sigma_sq = 1 / representative.players.sigma**2
+    # Population mass of each row: one per layer 1 player, n_observers * weight per type
+    mass = np.concatenate([np.ones(n_layer1), n_observers * weights])
+    grid = np.linspace(0, game.max_bet, grid_size)
+
+    bets = np.full(len(mass), game.max_bet / 2)
+    for iteration in range(1, max_iter + 1):
+        mean_x = mass @ bets / n_players
+        weighted_x = (mass * inv_sigma_sq) @ bets / (mass @ inv_sigma_sq)
+        responses = _aggregate_best_responses(representative, mean_x, weighted_x, n_players, grid)
+        regrets = _aggregate_regrets(representative, bets, responses, mean_x, weighted_x, n_players)
+        if regrets.max() < tol:
+            step = 0.0
+            break
+        new_bets = damping * bets + (1 - damping) * responses
+        step = np.max(np.abs(new_bets - bets))
+        bets = new_bets
+        if step < tol:
+            break
+
+    mean_x = mass @ bets / n_players
+    weighted_x = (mass * inv_sigma_sq) @ bets / (mass @ inv_sigma_sq)
+    responses = _aggregate_best_responses(representative, mean_x, weighted_x, n_players, grid)
+    regrets = _aggregate_regrets(representative, bets, responses, mean_x, weighted_x, n_players)
+    return OptimizeResult(x=bets[n_layer1:], sigma=sigma, reputation=np.array(reputation), weights=weights,
+                          layer1_bets=bets[:n_layer1], mean_bet=float(mean_x), weighted_mean_bet=float(weighted_x),
+                          regrets=regrets[n_layer1:], layer1_regrets=regrets[:n_layer1],
+                          nit=iteration, success=bool(step < tol))
+
+class TypeProfiles:
+    """
+    Every type profile of the game with its probability and the sigma each player has
+    under it (1 + 0.5 * type), so expected payoffs are one batched payoff_vector call.
+
+    Players can be partitioned into groups of interchangeable players sharing one type
+    distribution and one strategy. Each group then contributes its type multisets,
+    weighted by their multinomial probabilities, instead of every ordered combination.
+    """
+    def __init__(self, type_distributions: List[List[float]], n_players: int,
+                 groups: Optional[List[List[int]]] = None):
+        distributions = self._set_groups(type_distributions, n_players, groups)
+
+        group_profiles, group_probs = [], []
+        for members in self.groups:
+            multisets = np.array(list(combinations_with_replacement(range(self.n_types), len(members))))
+            counts = (multisets[:, :, None] == np.arange(self.n_types)).sum(axis=1)
+            # Multinomial probabilities in log space, as the factorials overflow beyond 20 members
+            log_probs = (gammaln(len(members) + 1) - gammaln(counts + 1).sum(axis=1)
+                         + xlogy(counts, distributions[members[0]]).sum(axis=1))
+            group_profiles.append(multisets)
+            group_probs.append(np.exp(log_probs))
+
+        combos = np.indices([len(p) for p in group_profiles]).reshape(len(self.groups), -1).T
+        self.profiles = np.empty((len(combos), n_players), dtype=int)
+        self.probs = np.ones(len(combos))
+        for g, members in enumerate(self.groups):
+            self.profiles[:, members] = group_profiles[g][combos[:, g]]
+            self.probs *= group_probs[g][combos[:, g]]
+        self.sigma = 1 + 0.5 * self.profiles
+
+    def _set_groups(self, type_distributions, n_players, groups):
+        distributions = np.asarray(type_distributions[:n_players], dtype=float)
+        self.n_players = n_players
+        self.n_types = distributions.shape[1]
+        self.groups = [[i] for i in range(n_players)] if groups is None else groups
+        self.group_index = np.empty(n_players, dtype=int)
+        for g, members in enumerate(self.groups):
+            if not np.allclose(distributions[members], distributions[members[0]]):
+                raise ValueError(f"Players {members} do not share a type distribution")
+            self.group_index[members] = g
+        return distributions
+
+    def std_error(self, values: np.ndarray) -> float:
+        """
+        Standard error of the expectation probs @ values; zero for exact enumeration.
+        """
+        return 0.0
+
+    @property
+    def n_groups(self) -> int:
+        return len(self.groups)
+
+    def expand(self, group_strategies: np.ndarray) -> np.ndarray:
+        """
+        Map per-group strategies of shape (n_groups, n_types) to per-player strategies.
+        """
+        return group_strategies[self.group_index]
+
+    def bets(self, strategies: np.ndarray) -> np.ndarray:
+        return strategies[np.arange(self.n_players), self.profiles]
+
+    def scatter(self, values: np.ndarray) -> np.ndarray:
+        """
+        Sum per-profile, per-player values back onto the (n_groups, n_types) strategy grid.
+        """
+        index = self.group_index * self.n_types + self.profiles
+        totals = np.bincount(index.ravel(), weights=values.ravel(), minlength=self.n_groups * self.n_types)
+        return totals.reshape(self.n_groups, self.n_types)
+
+class SampledTypeProfiles(TypeProfiles):
+    """
+    A fixed Sobol or Latin hypercube sample of type profiles, drawn as n_replicates
+    randomized replicates whose spread gives the standard error.
+    """
+    def __init__(self, type_distributions: List[List[float]], n_players: int,
+                 groups: Optional[List[List[int]]] = None, n_samples: int = 1024,
+                 sampler: str = "sobol", n_replicates: int = 8, seed=None):
+        distributions = self._set_groups(type_distributions, n_players, groups)
+        rng = np.random.default_rng(seed)
+        per_replicate = max(1, -(-n_samples // n_replicates))
+
+        points = []
+        for _ in range(n_replicates):
+            if sampler == "sobol":
+                engine = qmc.Sobol(n_players, scramble=True, seed=rng)
+                points.append(engine.random_base2(int(np.ceil(np.log2(per_replicate)))))
+            elif sampler == "lhs":
+                points.append(qmc.LatinHypercube(n_players, seed=rng).random(per_replicate))
+            else:
+                raise ValueError(f"Unknown sampler: {sampler}")
+        points = np.concatenate(points)
+
+        cdf = np.cumsum(distributions, axis=1)
+        self.n_replicates = n_replicates
+        self.profiles = np.minimum((points[:, :, None] >= cdf[None, :, :]).sum(axis=2), self.n_types - 1)
+        self.probs = np.full(len(points), 1 / len(points))
+        self.sigma = 1 + 0.5 * self.profiles
+
+    def std_error(self, values: np.ndarray) -> float:
+        replicate_means = values.reshape(self.n_replicates, -1).mean(axis=1)
+        return float(replicate_means.std(ddof=1) / np.sqrt(self.n_replicates))
+
+def exchangeable_groups(game: Game, type_distributions: List[List[float]],
+                        strategies: Optional[np.ndarray] = None) -> List[List[int]]:
+    """
+    Partition players into groups with the same payoff structure (layer and observer
+    multiplier) and the same type distribution, and, if given, the same strategy row.
+    """
+    groups = {}
+    for i, player in enumerate(game.layer1_players + game.layer2_players):
+        key = (i < len(game.layer1_players), player.role == 'observer', tuple(np.round(type_distributions[i], 12)))
+        if strategies is not None:
+            key += (tuple(np.round(strategies[i], 9)),)
+        groups.setdefault(key, []).append(i)
+    return list(groups.values())
+
+def _expected_objective(X: np.ndarray, game: Game, types: TypeProfiles, community: bool = False) -> np.ndarray:
+    # Negated expected total payoff (plus community benefit) of each column of X, as in _vectorized_objective
+    strategies = X.T.reshape(-1, types.n_groups, types.n_types)[:, types.group_index]
+    profile_bets = strategies[:, np.arange(types.n_players), types.profiles]
+    payoffs = game.payoff_vector(profile_bets, sigma=types.sigma).sum(axis=-1)
+    if community:
+        payoffs = payoffs + _community_benefit(game, profile_bets)[0]
+    return -(payoffs @ types.probs)
+
+def _maximize_expected_payoff(game: Game, types: TypeProfiles, initial_guess: np.ndarray) -> np.ndarray:
+    n_types = types.n_types
 
-def solve_bayesian_nash_equilibrium(game: Game, type_distributions: List[List[float]]) -> List[np.ndarray]:
-    n_types = len(type_distributions[0])
-    
     def bayesian_objective(X: np.ndarray) -> float:
-        strategies = X.reshape(len(game.layer1_players + game.layer2_players), n_types)
-        expected_payoff = 0.0
-        
-        for type_combo in np.ndindex(*[n_types] * len(game.layer1_players + game.layer2_players)):
-            prob = np.prod([type_distributions[i][t] for i, t in enumerate(type_combo)])
-            game_instance = Game(game.params, game.time_constraint)
-            game_instance.layer1_players = [player.copy() for player in game.layer1_players]
-            game_instance.layer2_players = [player.copy() for player in game.layer2_players]
-            for i, t in enumerate(type_combo):
-                if i < len(game.layer1_players):
-                    game_instance.layer1_players[i].sigma = 1 + 0.5 * t
-                else:
-                    game_instance.layer2_players[i - len(game.layer1_players)].sigma = 1 + 0.5 * t
-            
-            payoffs = [game_instance._pi_i(strategies[i, t], strategies[:, type_combo], i) 
-                       for i, t in enumerate(type_combo)]
-            expected_payoff += prob * np.sum(payoffs)
-        
-        return -float(expected_payoff)
+        return float(_expected_objective(X[:, None], game, types)[0])
 
-    initial_guess = np.ones(len(game.layer1_players + game.layer2_players) * n_types) * (game.max_bet / 2)
-    bounds = [(0, game.max_bet) for _ in range(len(game.layer1_players + game.layer2_players) * n_types)]
+    def bayesian_gradient(X: np.ndarray) -> np.ndarray:
+        profile_bets = types.bets(types.expand(X.reshape(types.n_groups, n_types)))
+        gradient = game.payoff_gradient(profile_bets, sigma=types.sigma) * types.probs[:, None]
+        return -types.scatter(gradient).ravel()
+
+    bounds = [(0, game.max_bet) for _ in range(len(initial_guess))]
+    nfev = 0
+    result = minimize(
+        bayesian_objective,
+        initial_guess,
+        method="SLSQP",
+        jac=bayesian_gradient,
+        bounds=bounds,
+        options={"ftol": 1e-8, "maxiter": 1000},
+    )
+    
+    if not result.success:
+        nfev = result.nfev
+        result = differential_evolution(_expected_objective, bounds, args=(game, types), maxiter=1000, tol=1e-8,
+                                        vectorized=True, updating="deferred")
+    result.nfev += nfev
+    
+    if not result.success:
+        raise ValueError(f"Failed to find Bayesian Nash equilibrium: {result.message}")
+    return result
+
+def solve_bayesian_nash_equilibrium(game: Game, type_distributions: List[List[float]],
+                                    exchangeable: bool = False, method: str = "exact",
+                                    n_samples: int = 1024, sampler: str = "sobol", tol: Optional[float] = None,
+                                    max_samples: int = 65536, seed=None, return_info: bool = False,
+                                    initial_guess: Optional[np.ndarray] = None):
+    """
+    Starts from initial_guess, of shape (n_players, n_types), or max_bet / 2 throughout.
+
+    With exchangeable=True, interchangeable players (see exchangeable_groups) share one
+    strategy and type profiles are enumerated as multisets per group.
+
+    method="sampled" uses n_samples sampled profiles, doubled up to max_samples until the
+    standard error is at most tol. return_info=True also returns a dict of solve details.
+    """
+    n_players = len(game.layer1_players + game.layer2_players)
+    n_types = len(type_distributions[0])
+    groups = exchangeable_groups(game, type_distributions) if exchangeable else None
+    info = {"method": method, "n_samples": None, "expected_payoff": None, "std_error": None, "nfev": 0}
 
     try:
-        result = minimize(
-            bayesian_objective,
-            initial_guess,
-            method="SLSQP",
-            bounds=bounds,
-            options={"ftol": 1e-8, "maxiter": 1000},
-        )
-        
-        if not result.success:
-            result = differential_evolution(bayesian_objective, bounds, maxiter=1000, tol=1e-8)
-        
-        if result.success:
-            return result.x.reshape(len(game.layer1_players + game.layer2_players), n_types)
-        else:
-            raise ValueError(f"Failed to find Bayesian Nash equilibrium: {result.message}")
+        start = None
+        while True:
+            if method == "exact":
+                types = TypeProfiles(type_distributions, n_players, groups)
+            elif method == "sampled":
+                types = SampledTypeProfiles(type_distributions, n_players, groups, n_samples, sampler, seed=seed)
+            else:
+                raise ValueError(f"Unknown BNE method: {method}")
+            if start is None and initial_guess is not None:
+                # One row per group, taken from the group's first player
+                guess = np.asarray(initial_guess, dtype=float)[[members[0] for members in types.groups]]
+                start = np.clip(guess, 0, game.max_bet).ravel()
+            elif start is None:
+                start = np.ones(types.n_groups * n_types) * (game.max_bet / 2)
+
+            result = _maximize_expected_payoff(game, types, start)
+            start = result.x
+            info["nfev"] += int(result.nfev)
+            strategies = types.expand(start.reshape(types.n_groups, n_types))
+
+            totals = game.payoff_vector(types.bets(strategies), sigma=types.sigma).sum(axis=1)
+            info.update(n_samples=len(types.probs), expected_payoff=float(types.probs @ totals),
+                        std_error=types.std_error(totals))
+            if method == "exact" or tol is None or info["std_error"] <= tol or n_samples >= max_samples:
+                break
+            n_samples = min(2 * n_samples, max_samples)
+
+        if method == "sampled":
+            print(f"Sampled BNE: {info['n_samples']} type profiles, expected payoff "
+                  f"{info['expected_payoff']:.4f} +/- {info['std_error']:.4f}")
     except Exception as e:
         print(f"Error in BNE solver: {str(e)}")
-        return np.ones((len(game.layer1_players + game.layer2_players), n_types)) * (game.max_bet / 2)
+        strategies = np.ones((n_players, n_types)) * (game.max_bet / 2)
+
+    return (strategies, info) if return_info else strategies
+
+def _bayesian_deviation_objective(x: np.ndarray, game: Game, X: np.ndarray, probs: np.ndarray,
+                                  sigma: np.ndarray, i: int) -> Tuple[float, np.ndarray]:
+    X = X.copy()
+    X[:, i] = x[0]
+    expected_payoff = probs @ game.payoff_vector(X, sigma=sigma)[:, i]
+    expected_gradient = probs @ game.own_payoff_gradient(X, sigma=sigma)[:, i]
+    return -expected_payoff, -np.atleast_1d(expected_gradient)
+
+def _bayesian_regrets(game: Game, types: TypeProfiles, strategies: np.ndarray, i: int, grid_size: int) -> np.ndarray:
+    """
+    Regret of player i for each of its types, screening deviations on a bet grid in one
+    batched evaluation per type and polishing only promising grid optima.
+    """
+    profile_bets = types.bets(strategies)
+    grid = np.linspace(0, game.max_bet, grid_size)
+    regrets = np.zeros(types.n_types)
+
+    for t in range(types.n_types):
+        mask = types.profiles[:, i] == t
+        X, probs, sigma = profile_bets[mask], types.probs[mask], types.sigma[mask]
+        current = probs @ game.payoff_vector(X, sigma=sigma)[:, i]
+
+        deviations = np.repeat(X[None], grid_size, axis=0)
+        deviations[:, :, i] = grid[:, None]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            values = game.payoff_vector(deviations, sigma=sigma)[:, :, i] @ probs
+        values = np.where(np.isnan(values), -np.inf, values)
+        k = values.argmax()
+        best = values[k]
+
+        if best + _grid_variation(values) >= current:
+            bounds = [(grid[max(k - 1, 0)], grid[min(k + 1, grid_size - 1)])]
+            res = minimize(_bayesian_deviation_objective, [grid[k]], args=(game, X, probs, sigma, i),
+                           jac=True, method="L-BFGS-B", bounds=bounds)
+            best = max(best, -res.fun)
+        regrets[t] = max(best - current, 0)
+
+    return regrets
+
+def bayesian_nash_regrets(game: Game, strategies: List[np.ndarray], type_distributions: List[List[float]],
+                          exchangeable: bool = False, grid_size: int = 65,
+                          max_workers: Optional[int] = None) -> np.ndarray:
+    """
+    Regret of every (player, type) pair under the type-contingent strategies, shaped
+    (n_players, n_types).
+
+    With exchangeable=True, only one player per group of interchangeable players with
+    identical strategies is checked, against type multisets of the other players, and
+    its regrets are reported for the whole group. With max_workers > 1 the players are
+    checked in a process pool.
+    """
+    n_players = len(game.layer1_players + game.layer2_players)
+    strategies = np.asarray(strategies, dtype=float)
+    if exchangeable:
+        checks = []
+        groups = exchangeable_groups(game, type_distributions, strategies)
+        for members in groups:
+            i = members[0]
+            split_groups = [[j for j in g if j != i] for g in groups if g != [i]]
+            split_groups = [g for g in split_groups if g] + [[i]]
+            checks.append((members, TypeProfiles(type_distributions, n_players, split_groups)))
+    else:
+        types = TypeProfiles(type_distributions, n_players)
+        checks = [([i], types) for i in range(n_players)]
+
+    tasks = [(game, types, strategies, members[0], grid_size) for members, types in checks]
+    if max_workers is not None and max_workers > 1:
+        with multiprocessing.Pool(max_workers) as pool:
+            results = pool.starmap(_bayesian_regrets, tasks)
+    else:
+        results = [_bayesian_regrets(*task) for task in tasks]
+
+    regrets = np.zeros(strategies.shape)
+    for (members, _), player_regrets in zip(checks, results):
+        regrets[members] = player_regrets
+    return regrets
 
 def is_bayesian_nash_equilibrium(game: Game, strategies: List[np.ndarray], 
-                                 type_distributions: List[List[float]], epsilon: float = 1e-6) -> bool:
-    n_types = len(type_distributions[0])
-    
-    for i in range(len(game.layer1_players + game.layer2_players)):
-        for t in range(n_types):
-            def f(x):
-                strategies_copy = [s.copy() for s in strategies]
-                strategies_copy[i][t] = x
-                expected_payoff = 0
-                
-                for type_combo in np.ndindex(*[n_types] * len(game.layer1_players + game.layer2_players)):
-                    if type_combo[i] != t:
-                        continue
-                    prob = np.prod([type_distributions[j][tj] for j, tj in enumerate(type_combo)])
-                    game_instance = Game(game.params, game.time_constraint)
-                    game_instance.layer1_players = [player.copy() for player in game.layer1_players]
-                    game_instance.layer2_players = [player.copy() for player in game.layer2_players]
-                    for j, tj in enumerate(type_combo):
-                        if j < len(game.layer1_players):
-                            game_instance.layer1_players[j].sigma = 1 + 0.5 * tj
-                        else:
-                            game_instance.layer2_players[j - len(game.layer1_players)].sigma = 1 + 0.5 * tj
-                    
-                    payoff = game_instance._pi_i(x, [s[tj] for j, (s, tj) in enumerate(zip(strategies_copy, type_combo))], i)
-                    expected_payoff += prob * payoff
-                
-                return -expected_payoff
-
-            res = minimize(f, strategies[i][t], method="L-BFGS-B", bounds=[(0, game.max_bet)])
-            if f(strategies[i][t]) > f(res.x[0]) + epsilon:
-                return False
-    return True
-
-def solve_community_focused_bne(game: Game, type_distributions: List[List[float]]) -> List[np.ndarray]:
-    n_types = len(type_distributions[0])
+                                 type_distributions: List[List[float]], epsilon: float = 1e-6,
+                                 exchangeable: bool = False, max_workers: Optional[int] = None) -> bool:
+    regrets = bayesian_nash_regrets(game, strategies, type_distributions, exchangeable=exchangeable,
+                                    max_workers=max_workers)
+    return bool(np.all(regrets <= epsilon))
+
+def _community_benefit(game: Game, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Community benefit of each bet profile in X and its gradient.
+    """
+    n = X.shape[-1]
+    mean_x = X.mean(axis=-1, keepdims=True)
+    community_alignment = 1 - np.mean(np.abs(X - mean_x), axis=-1, keepdims=True) / mean_x
+    benefit = game.params.community_factor * community_alignment * mean_x * 5
+    sign = np.sign(X - mean_x)
+    gradient = game.params.community_factor * 5 * (1 - sign + sign.mean(axis=-1, keepdims=True)) / n
+    return benefit[..., 0], gradient
+
+def solve_community_focused_bne(game: Game, type_distributions: List[List[float]],
+                                exchangeable: bool = False) -> List[np.ndarray]:
+    n_players = len(game.layer1_players + game.layer2_players)
+    groups = exchangeable_groups(game, type_distributions) if exchangeable else None
+    types = TypeProfiles(type_distributions, n_players, groups)
+    n_types = types.n_types
+    n_variables = types.n_groups * n_types
     
     def community_focused_objective(X: np.ndarray) -> float:
-        strategies = X.reshape(len(game.layer1_players + game.layer2_players), n_types)
-        expected_payoff = 0
-        community_benefit = 0
-
-        for type_combo in np.ndindex(*[n_types] * len(game.layer1_players + game.layer2_players)):
-            prob = np.prod([type_distributions[i][t] for i, t in enumerate(type_combo)])
-            game_instance = Game(game.params, game.time_constraint)
-            game_instance.layer1_players = [player.copy() for player in game.layer1_players]
-            game_instance.layer2_players = [player.copy() for player in game.layer2_players]
-            for i, t in enumerate(type_combo):
-                if i < len(game.layer1_players):
-                    game_instance.layer1_players[i].sigma = 1 + 0.5 * t
-                else:
-                    game_instance.layer2_players[i - len(game.layer1_players)].sigma = 1 + 0.5 * t
-
-            payoffs = [game_instance._pi_i(strategies[i, t], strategies[:, type_combo], i) 
-                       for i, t in enumerate(type_combo)]
-            expected_payoff += prob * np.sum(payoffs)
-            community_alignment = 1 - np.mean(abs(strategies[:, type_combo] - np.mean(strategies[:, type_combo])) / np.mean(strategies[:, type_combo]))
-            community_benefit += prob * game_instance.params.community_factor * community_alignment * np.mean(strategies[:, type_combo]) * 5
-
-        return -(expected_payoff + community_benefit)
-
-    initial_guess = np.ones(len(game.layer1_players + game.layer2_players) * n_types) * (game.max_bet / 2)
-    bounds = [(0, game.max_bet) for _ in range(len(game.layer1_players + game.layer2_players) * n_types)]
+        return float(_expected_objective(X[:, None], game, types, community=True)[0])
+
+    def community_focused_gradient(X: np.ndarray) -> np.ndarray:
+        profile_bets = types.bets(types.expand(X.reshape(types.n_groups, n_types)))
+        _, community_gradient = _community_benefit(game, profile_bets)
+        gradient = (game.payoff_gradient(profile_bets, sigma=types.sigma) + community_gradient) * types.probs[:, None]
+        return -types.scatter(gradient).ravel()
+
+    initial_guess = np.ones(n_variables) * (game.max_bet / 2)
+    bounds = [(0, game.max_bet) for _ in range(n_variables)]
 
     result = minimize(
         community_focused_objective,
         initial_guess,
         method="L-BFGS-B",
+        jac=community_focused_gradient,
         bounds=bounds,
         options={"ftol": 1e-8, "maxiter": 1000},
     )
 
-    if result.success:
-        return result.x.reshape(len(game.layer1_players + game.layer2_players), n_types)
-    
+    # A symmetric start sits on the kinks of the alignment terms, where the line search can stall
+    if not result.success:
+        result = differential_evolution(_expected_objective, bounds, args=(game, types, True), maxiter=1000,
+                                        tol=1e-8, vectorized=True, updating="deferred")
+
+    if not result.success:
+        raise ValueError(f"Failed to find community-focused Bayesian Nash equilibrium: {result.message}")
+    return types.expand(result.x.reshape(types.n_groups, n_types))
+
+
+def analyze_equilibria(game: Game, type_distributions: List[List[float]], use_cache: bool = True,
+                       cache: Optional[EquilibriumCache] = None) -> Tuple[np.ndarray, List[np.ndarray], List[np.ndarray]]:
+    """
+    Solve for the NE, BNE and CBNE of game. With use_cache=True results are looked up in,
+    and stored to, cache (the shared on-disk cache by default), keyed by the game
+    parameters, time constraint, type distributions and SOLVER_VERSION.
+    """
+    if use_cache:
+        cache = default_cache() if cache is None else cache
+        key = cache.key(game.params, game.time_constraint, type_distributions, SOLVER_VERSION)
+        cached = cache.get(key)
+        stats = cache.stats()
+        print(f"Equilibrium cache {'hit' if cached is not None else 'miss'} "
+              f"(hits: {stats['hits']}, misses: {stats['misses']})")
+        if cached is not None:
+            ne, bne, cbne = cached
+            print(f"Nash Equilibrium: {ne}")
+            print(f"Bayesian Nash Equilibrium:\n{bne}")
+            print(f"Community-Focused Bayesian Nash Equilibrium:\n{cbne}")
+            return ne, bne, cbne
 
-def analyze_equilibria(game: Game, type_distributions: List[List[float]]) -> Tuple[np.ndarray, List[np.ndarray], List[np.ndarray]]:
     print("Solving for Nash Equilibrium...")
     ne = solve_nash_equilibrium(game)
     print(f"Nash Equilibrium: {ne}")
@@ -197,6 +804,9 @@ def analyze_equilibria(game: Game, type_distributions: List[List[float]]) -> Tup
     except Exception as e:
         print(f"Failed to solve CBNE: {str(e)}")
         cbne = None
+
+    if use_cache:
+        cache.put(key, (ne, bne, cbne))
     
     return ne, bne, cbne
 
@@ -0,0 +1,120 @@
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import pickle
+import numpy as np
+from nash_equilibrium_solver import SOLVER_VERSION
+
+DEFAULT_CHECKPOINT_DIR = 'sweep_checkpoints'
+
+def expand_values(value):
+    """
+    Values of one swept setting: a list is a grid of values, a dict with start/stop and
+    num or step is a range including stop, anything else is a single value.
+    """
+    if isinstance(value, list):
+        return value
+    if isinstance(value, dict):
+        if 'num' in value:
+            return np.linspace(value['start'], value['stop'], value['num']).tolist()
+        step = value.get('step', 1)
+        # Half a step past stop, so stop itself is included despite rounding
+        return np.arange(value['start'], value['stop'] + step / 2, step).tolist()
+    return [value]
+
+def expand_parameter_sets(parameter_sets):
+    """
+    Expand each config parameter set into the cartesian product of its game parameter
+    and time_constraint values, in config order.
+    """
+    points = []
+    for parameter_set in parameter_sets:
+        names = list(parameter_set['game_parameters'])
+        grids = [expand_values(parameter_set['game_parameters'][name]) for name in names]
+        grids.append(expand_values(parameter_set['time_constraint']))
+        for values in itertools.product(*grids):
+            points.append({'game_parameters': dict(zip(names, values[:-1])), 'time_constraint': values[-1]})
+    return points
+
+def point_key(point, solver_version=SOLVER_VERSION):
+    # Keyed by the solver version too, so a sweep resumed after a solver change reruns its points
+    content = {'point': point, 'solver_version': solver_version}
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()
+
+def run_point(point):
+    """
+    Run the single game analysis and the evolutionary simulation for one sweep point.
+    """
+    from mathematical_model import GameParameters
+    from model_analysis import run_analysis, run_evolutionary_simulation
+
+    game_params = GameParameters(**point['game_parameters'])
+    time_constraint = point['time_constraint']
+    ne, bne, cbne, layer1_profit, layer2_profit, community_score = run_analysis(game_params, time_constraint)
+    avg_strategy_history, nash_distance_history = run_evolutionary_simulation(game_params, time_constraint)
+    return {
+        "ne": ne,
+        "bne": bne,
+        "cbne": cbne,
+        "layer1_profit": layer1_profit,
+        "layer2_profit": layer2_profit,
+        "avg_strategy_history": avg_strategy_history,
+        "nash_distance_history": nash_distance_history,
+        "community_score": community_score,
+    }
+
+def _run_checkpointed(evaluate, point, key):
+    # Seed from the point so that pool workers forked with the same random state draw
+    # different, reproducible streams
+    np.random.seed(int(key[:8], 16))
+    try:
+        return key, evaluate(point), None
+    except Exception as e:
+        return key, None, f"{type(e).__name__}: {e}"
+
+def _run_star(args):
+    return _run_checkpointed(*args)
+
+def _checkpoint_path(checkpoint_dir, key):
+    return os.path.join(checkpoint_dir, key + '.pkl')
+
+def run_sweep(parameter_sets, checkpoint_dir=DEFAULT_CHECKPOINT_DIR, max_workers=None, evaluate=run_point):
+    """
+    Evaluate every point of the expanded parameter sets across a process pool.
+
+    Each finished point is written to checkpoint_dir as soon as it completes, and points
+    already there are loaded instead of rerun, so an interrupted sweep resumes where it
+    stopped. Points that raise are reported and left out. Returns (points, results) for
+    the completed points, in expansion order.
+    """
+    points = expand_parameter_sets(parameter_sets)
+    keys = [point_key(point) for point in points]
+    os.makedirs(checkpoint_dir, exist_ok=True)
+
+    results = {}
+    for key in keys:
+        path = _checkpoint_path(checkpoint_dir, key)
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                results[key] = pickle.load(f)
+
+    pending = [(evaluate, point, key) for key, point in dict(zip(keys, points)).items() if key not in results]
+    print(f"Parameter sweep: {len(points)} points, {len(results)} already checkpointed, {len(pending)} to run")
+
+    if pending:
+        with multiprocessing.Pool(max_workers) as pool:
+            for done, (key, result, error) in enumerate(pool.imap_unordered(_run_star, pending), 1):
+                if error is not None:
+                    print(f"Sweep point {key[:12]} failed: {error}")
+                    continue
+                path = _checkpoint_path(checkpoint_dir, key)
+                with open(path + '.tmp', 'wb') as f:
+                    pickle.dump(result, f)
+                os.replace(path + '.tmp', path)
+                results[key] = result
+                print(f"Sweep progress: {done}/{len(pending)}")
+
+    completed = [i for i, key in enumerate(keys) if key in results]
+    return [points[i] for i in completed], [results[keys[i]] for i in completed]
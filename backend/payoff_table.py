@@ -0,0 +1,114 @@
+import numpy as np
+from mathematical_model import Game
+from nash_equilibrium_solver import best_responses
+
+class PayoffTable:
+    """
+    Every player's payoff tabulated on a grid of own bets from 0 to max_bet, for a fixed
+    Game (its sigmas, roles, reputations, community_score and time_constraint).
+
+    A player's payoff depends on the other bets only through their sum and their
+    1/sigma**2-weighted sum, so each player's table has axes (own bet, others' total,
+    others' weighted total), the last two sampled on aggregate_size points and linearly
+    interpolated. Values are stored as float32, in a .npy memmap when path is given.
+    Deviations with an undefined payoff (every bet zero) are stored as -inf.
+    """
+    def __init__(self, game: Game, grid_size: int = 81, aggregate_size: int = 33, path=None, values=None):
+        self.game = game
+        n_players = len(game.players)
+        self.grid = np.linspace(0, game.max_bet, grid_size)
+        self.inv_sigma_sq = 1 / game.players.sigma**2
+        self.others_total = np.linspace(0, (n_players - 1) * game.max_bet, aggregate_size)
+        self.others_weighted_max = game.max_bet * (self.inv_sigma_sq.sum() - self.inv_sigma_sq)
+
+        shape = (grid_size, aggregate_size, aggregate_size, n_players)
+        if values is not None:
+            if values.shape != shape:
+                raise ValueError(f"Payoff table has shape {values.shape}, expected {shape}")
+            self.values = values
+        elif path is not None:
+            self.values = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32, shape=shape)
+            self._build()
+            self.values.flush()
+        else:
+            self.values = np.empty(shape, dtype=np.float32)
+            self._build()
+
+    @classmethod
+    def open(cls, game: Game, path):
+        """
+        Memory-map a table previously built for game with PayoffTable(game, path=path).
+        """
+        values = np.load(path, mmap_mode='r')
+        return cls(game, grid_size=values.shape[0], aggregate_size=values.shape[1], values=values)
+
+    def _build(self):
+        n_players = len(self.inv_sigma_sq)
+        others_total = self.others_total[:, None, None]
+        fractions = np.linspace(0, 1, len(self.others_total))[None, :, None]
+        others_weighted = fractions * self.others_weighted_max
+
+        # One own-bet slice at a time keeps the float64 intermediates small
+        for g, x in enumerate(self.grid):
+            x = np.full((1, 1, n_players), x)
+            total_x = x + others_total
+            weighted_x = (x * self.inv_sigma_sq + others_weighted) / self.inv_sigma_sq.sum()
+            with np.errstate(divide="ignore", invalid="ignore"):
+                payoff = self.game._payoff_from_aggregates(x, self.inv_sigma_sq, total_x / n_players, total_x, weighted_x)
+            self.values[g] = np.where(np.isnan(payoff), -np.inf, payoff)
+
+    def _lookup(self, X: np.ndarray, players: np.ndarray) -> np.ndarray:
+        # Interpolate the tabulated own-bet curves of the listed players at the others'
+        # aggregates of each profile in X (batch, n_players); returns (batch, players, grid)
+        weighted = X * self.inv_sigma_sq
+        others_total = (X.sum(axis=-1, keepdims=True) - X)[:, players]
+        others_weighted = (weighted.sum(axis=-1, keepdims=True) - weighted)[:, players]
+
+        last = len(self.others_total) - 1
+        s = np.clip(others_total / self.others_total[-1] * last, 0, last)
+        w = np.clip(others_weighted / self.others_weighted_max[players] * last, 0, last)
+        s0, w0 = np.minimum(s.astype(int), last - 1), np.minimum(w.astype(int), last - 1)
+        ts, tw = (s - s0)[None], (w - w0)[None]
+
+        corner = lambda ds, dw: self.values[:, s0 + ds, w0 + dw, players].astype(float)
+        with np.errstate(invalid="ignore"):
+            values = ((1 - ts) * (1 - tw) * corner(0, 0) + ts * (1 - tw) * corner(1, 0)
+                      + (1 - ts) * tw * corner(0, 1) + ts * tw * corner(1, 1))
+        return np.moveaxis(np.where(np.isnan(values), -np.inf, values), 0, -1)
+
+    def deviation_payoffs(self, X: np.ndarray, players=None) -> np.ndarray:
+        """
+        Approximate payoff of each listed player for every grid bet, the others betting X.
+        """
+        X = np.asarray(X, dtype=float)
+        players = np.arange(len(X)) if players is None else np.asarray(players)
+        return self._lookup(X[None], players)[0]
+
+    def payoffs(self, X: np.ndarray) -> np.ndarray:
+        """
+        Approximate payoff_vector for profiles X of shape (n_players,) or (batch, n_players),
+        interpolating linearly between own-bet grid points.
+        """
+        X = np.asarray(X, dtype=float)
+        batch = np.atleast_2d(X)
+        curves = self._lookup(batch, np.arange(batch.shape[-1]))
+        position = np.clip(batch / self.grid[-1] * (len(self.grid) - 1), 0, len(self.grid) - 1)
+        lower = np.minimum(position.astype(int), len(self.grid) - 2)
+        t = position - lower
+        below = np.take_along_axis(curves, lower[..., None], axis=-1)[..., 0]
+        above = np.take_along_axis(curves, lower[..., None] + 1, axis=-1)[..., 0]
+        with np.errstate(invalid="ignore"):
+            values = np.where(t > 0, (1 - t) * below + t * above, below)
+        return values.reshape(X.shape)
+
+    def best_response(self, X: np.ndarray, players=None, refine: bool = True):
+        """
+        Best responses and their exact payoffs, found by table lookup and, with refine=True,
+        polished on the exact payoff between the neighbouring grid points.
+        """
+        return best_responses(self.game, X, players, polish=refine, table=self)
+
+    def regrets(self, X: np.ndarray, refine: bool = True) -> np.ndarray:
+        X = np.asarray(X, dtype=float)
+        values = self.best_response(X, refine=refine)[1]
+        return np.maximum(values - self.game.payoff_vector(X), 0)
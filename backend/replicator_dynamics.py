@@ -0,0 +1,48 @@
+import numpy as np
+from scipy.integrate import solve_ivp
+
+def grid_fitness(game, strategies, grid):
+    """
+    Fitness of every grid bet for every player: its payoff when playing that bet while
+    the other players bet the expected values of their mixed strategies.
+
+    strategies has shape (n_players, grid_size), one probability vector per player.
+    """
+    expected_bets = strategies @ grid
+    with np.errstate(divide="ignore", invalid="ignore"):
+        payoffs = game.deviation_payoffs(expected_bets, np.arange(len(strategies)), grid)
+    return np.nan_to_num(payoffs, nan=0.0)
+
+def replicator_dynamics(game, ne, num_generations=10, grid_size=81, initial_strategies=None):
+    """
+    Integrate the replicator equation dp_i/dt = p_i * (f_i - p_i . f_i) for mixed
+    strategies p_i over a grid of bets from 0 to max_bet, with solve_ivp.
+
+    Fitness is measured in units of max_bet so that one unit of time plays the role of one
+    generation of run_evolutionary_simulation. Starts from uniform strategies unless
+    initial_strategies (n_players x grid_size) is given. Returns the expected bets and
+    their distance from ne after each generation, like run_evolutionary_simulation.
+    """
+    n_players = len(game.players)
+    grid = np.linspace(0, game.params.max_bet, grid_size)
+    if initial_strategies is None:
+        initial_strategies = np.full((n_players, grid_size), 1.0 / grid_size)
+    scale = 1.0 / game.params.max_bet
+
+    def rhs(t, y):
+        strategies = y.reshape(n_players, grid_size)
+        fitness = grid_fitness(game, strategies, grid) * scale
+        mean_fitness = np.sum(strategies * fitness, axis=1, keepdims=True)
+        return (strategies * (fitness - mean_fitness)).ravel()
+
+    generations = np.arange(1, num_generations + 1)
+    solution = solve_ivp(rhs, (0, num_generations), np.ravel(initial_strategies), t_eval=generations,
+                         rtol=1e-6, atol=1e-9)
+    if not solution.success:
+        raise RuntimeError(f"Replicator dynamics integration failed: {solution.message}")
+
+    strategies = np.clip(solution.y.T.reshape(-1, n_players, grid_size), 0, None)
+    strategies /= strategies.sum(axis=2, keepdims=True)
+    avg_strategy_history = strategies @ grid
+    nash_distance_history = np.linalg.norm(avg_strategy_history - ne, axis=1)
+    return avg_strategy_history, nash_distance_history
@@ -0,0 +1,145 @@
+import json
+import os
+import shutil
+import numpy as np
+
+class ResultStore:
+    """
+    Columnar store of result arrays on disk, indexed by parameter-set id and run id.
+
+    Each column is a raw binary file of fixed-dtype rows that chunks are appended to,
+    described by the run's meta.json (dtype, row shape and number of complete rows).
+    Reads are read-only memory maps, so columns far larger than RAM can be analysed
+    without loading them. Rows are only counted once their chunk is fully written, so
+    an interrupted append leaves the column as it was before the append.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _run_dir(self, param_set_id, run_id):
+        return os.path.join(self.directory, str(param_set_id), str(run_id))
+
+    def _load_meta(self, run_dir):
+        path = os.path.join(run_dir, 'meta.json')
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    def _save_meta(self, run_dir, meta):
+        path = os.path.join(run_dir, 'meta.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(meta, f)
+        os.replace(path + '.tmp', path)
+
+    def append(self, param_set_id, run_id, column, values):
+        """
+        Append a chunk of rows, shape (n_rows, *row_shape), to a column of a run.
+        """
+        values = np.ascontiguousarray(values)
+        run_dir = self._run_dir(param_set_id, run_id)
+        os.makedirs(run_dir, exist_ok=True)
+        meta = self._load_meta(run_dir)
+
+        entry = meta.get(column)
+        if entry is None:
+            entry = {'dtype': values.dtype.str, 'shape': list(values.shape[1:]), 'rows': 0}
+        elif values.dtype.str != entry['dtype'] or list(values.shape[1:]) != entry['shape']:
+            raise ValueError(f"Column {column} stores rows of {entry['dtype']} {tuple(entry['shape'])}, "
+                             f"got {values.dtype.str} {values.shape[1:]}")
+
+        path = os.path.join(run_dir, column + '.bin')
+        row_bytes = values.dtype.itemsize * int(np.prod(entry['shape']))
+        with open(path, 'ab') as f:
+            # Drop any partial chunk left by an interrupted append
+            f.truncate(entry['rows'] * row_bytes)
+            f.write(values.tobytes())
+
+        entry['rows'] += len(values)
+        meta[column] = entry
+        self._save_meta(run_dir, meta)
+
+    def append_columns(self, param_set_id, run_id, **columns):
+        for column, values in columns.items():
+            self.append(param_set_id, run_id, column, values)
+
+    def read(self, param_set_id, run_id, column):
+        """
+        Read-only memory map of a column, shape (rows, *row_shape).
+        """
+        run_dir = self._run_dir(param_set_id, run_id)
+        entry = self._load_meta(run_dir).get(column)
+        if entry is None:
+            raise KeyError(f"No column {column} for parameter set {param_set_id}, run {run_id}")
+        shape = (entry['rows'],) + tuple(entry['shape'])
+        if entry['rows'] == 0:
+            return np.empty(shape, dtype=entry['dtype'])
+        return np.memmap(os.path.join(run_dir, column + '.bin'), dtype=entry['dtype'], mode='r', shape=shape)
+
+    def remove(self, param_set_id, run_id):
+        shutil.rmtree(self._run_dir(param_set_id, run_id), ignore_errors=True)
+
+    def columns(self, param_set_id, run_id):
+        return sorted(self._load_meta(self._run_dir(param_set_id, run_id)))
+
+    def param_set_ids(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name for name in os.listdir(self.directory) if os.path.isdir(os.path.join(self.directory, name)))
+
+    def run_ids(self, param_set_id):
+        param_set_dir = os.path.join(self.directory, str(param_set_id))
+        if not os.path.isdir(param_set_dir):
+            return []
+        return sorted(name for name in os.listdir(param_set_dir) if os.path.isdir(os.path.join(param_set_dir, name)))
+
+RESULT_SCALARS = ('layer1_profit', 'layer2_profit', 'community_score')
+
+def save_results(store, points, results, run_id=0):
+    """
+    Store parameter sweep results, one parameter set per sweep point keyed by its hash.
+    Results that are None are left out and read back as None; points already stored
+    for run_id are skipped.
+    """
+    from parameter_sweep import point_key
+
+    for order, (point, result) in enumerate(zip(points, results)):
+        param_set_id = point_key(point)[:16]
+        columns = store.columns(param_set_id, run_id)
+        if 'point' in columns:
+            continue
+        if columns:
+            # Left over from an interrupted save
+            store.remove(param_set_id, run_id)
+        for name, value in result.items():
+            if value is None:
+                continue
+            value = np.asarray(value, dtype=float)
+            store.append(param_set_id, run_id, name, value[None] if name in RESULT_SCALARS else value)
+        # The point is written last, marking the parameter set as complete
+        store.append(param_set_id, run_id, 'order', np.array([order]))
+        store.append(param_set_id, run_id, 'point', np.frombuffer(json.dumps(point).encode(), dtype=np.uint8))
+
+def load_results(store, run_id=0):
+    """
+    Read back (points, results) saved by save_results, with arrays as memory maps.
+    """
+    loaded = []
+    for param_set_id in store.param_set_ids():
+        columns = store.columns(param_set_id, run_id)
+        if 'point' not in columns:
+            continue
+        point = json.loads(store.read(param_set_id, run_id, 'point').tobytes())
+        result = {}
+        for name in ('ne', 'bne', 'cbne', 'layer1_profit', 'layer2_profit', 'avg_strategy_history',
+                     'nash_distance_history', 'community_score'):
+            if name not in columns:
+                result[name] = None
+            elif name in RESULT_SCALARS:
+                result[name] = float(store.read(param_set_id, run_id, name)[0])
+            else:
+                result[name] = store.read(param_set_id, run_id, name)
+        loaded.append((int(store.read(param_set_id, run_id, 'order')[0]), point, result))
+
+    loaded.sort(key=lambda entry: entry[0])
+    return [point for _, point, _ in loaded], [result for _, _, result in loaded]
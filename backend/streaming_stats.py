@@ -0,0 +1,133 @@
+import numpy as np
+
+class TDigest:
+    """
+    Mergeable quantile sketch of a scalar stream in the style of a merging t-digest:
+    weighted centroids whose sizes shrink towards the tails, so extreme quantiles stay
+    accurate while the sketch holds at most about compression centroids.
+    """
+    def __init__(self, compression=200):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values, weights=None):
+        values = np.ravel(np.asarray(values, dtype=float))
+        if len(values) == 0:
+            return self
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        if weights is None:
+            # Summarize the batch on its own first, so only a few centroids need merging
+            values = np.sort(values)
+            values, weights = self._cluster(values, np.ones(len(values)))
+        else:
+            weights = np.ravel(np.asarray(weights, dtype=float))
+        self._compress(np.concatenate([self.means, values]), np.concatenate([self.weights, weights]))
+        return self
+
+    def merge(self, other):
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress(np.concatenate([self.means, other.means]), np.concatenate([self.weights, other.weights]))
+        return self
+
+    def _compress(self, means, weights):
+        order = np.argsort(means, kind='stable')
+        self.means, self.weights = self._cluster(means[order], weights[order])
+
+    def _cluster(self, means, weights):
+        # Sorted points whose mid-rank falls in the same unit of the arcsine scale function share a centroid
+        q = (np.cumsum(weights) - weights / 2) / weights.sum()
+        k = np.floor(self.compression * (np.arcsin(2 * q - 1) / np.pi + 0.5))
+        starts = np.flatnonzero(np.r_[True, np.diff(k) > 0])
+        cluster_weights = np.add.reduceat(weights, starts)
+        return np.add.reduceat(means * weights, starts) / cluster_weights, cluster_weights
+
+    def quantile(self, q):
+        if len(self.means) == 0:
+            return np.full(np.shape(q), np.nan)
+        ranks = (np.cumsum(self.weights) - self.weights / 2) / self.weights.sum()
+        return np.interp(q, np.r_[0, ranks, 1], np.r_[self.min, self.means, self.max])
+
+class StreamingStats:
+    """
+    Constant-memory summary of a stream of arrays of the given shape: count, mean and
+    variance (Welford, combined batch-wise with Chan's update), min, max, t-digest
+    quantiles and, when bin edges are given, histograms. Values outside the edges are
+    counted in the first or last bin. Accumulators of the same shape can be merged, e.g.
+    across workers.
+    """
+    def __init__(self, shape=(), compression=200, bins=None):
+        self.shape = tuple(shape)
+        self.count = 0
+        self.mean = np.zeros(self.shape)
+        self._m2 = np.zeros(self.shape)
+        self.min = np.full(self.shape, np.inf)
+        self.max = np.full(self.shape, -np.inf)
+        self.digests = [TDigest(compression) for _ in range(int(np.prod(self.shape)))]
+        self.bin_edges = None if bins is None else np.asarray(bins, dtype=float)
+        self.histogram = None if bins is None else np.zeros(self.shape + (len(self.bin_edges) - 1,), dtype=np.int64)
+
+    def update(self, batch):
+        """
+        Add a batch of observations of shape (n, *shape).
+        """
+        batch = np.asarray(batch, dtype=float).reshape((-1,) + self.shape)
+        n = len(batch)
+        if n == 0:
+            return self
+        batch_mean = batch.mean(axis=0)
+        batch_m2 = ((batch - batch_mean) ** 2).sum(axis=0)
+        self._combine(n, batch_mean, batch_m2)
+        self.min = np.minimum(self.min, batch.min(axis=0))
+        self.max = np.maximum(self.max, batch.max(axis=0))
+
+        columns = batch.reshape(n, -1)
+        for j, digest in enumerate(self.digests):
+            digest.update(columns[:, j])
+        if self.histogram is not None:
+            n_bins = len(self.bin_edges) - 1
+            bins = np.clip(np.searchsorted(self.bin_edges, columns, side='right') - 1, 0, n_bins - 1)
+            histogram = self.histogram.reshape(-1, n_bins)
+            for j in range(columns.shape[1]):
+                histogram[j] += np.bincount(bins[:, j], minlength=n_bins)
+        return self
+
+    def merge(self, other):
+        if other.shape != self.shape:
+            raise ValueError(f"Cannot merge statistics of shape {other.shape} into shape {self.shape}")
+        if other.count == 0:
+            return self
+        self._combine(other.count, other.mean, other._m2)
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+        for digest, other_digest in zip(self.digests, other.digests):
+            digest.merge(other_digest)
+        if self.histogram is not None:
+            if other.histogram is None or not np.array_equal(self.bin_edges, other.bin_edges):
+                raise ValueError("Cannot merge histograms with different bin edges")
+            self.histogram += other.histogram
+        return self
+
+    def _combine(self, n, mean, m2):
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean = self.mean + delta * n / total
+        self._m2 = self._m2 + m2 + delta ** 2 * self.count * n / total
+        self.count = total
+
+    def variance(self, ddof=0):
+        return self._m2 / (self.count - ddof) if self.count > ddof else np.full(self.shape, np.nan)
+
+    def std(self, ddof=0):
+        return np.sqrt(self.variance(ddof))
+
+    def quantile(self, q):
+        """
+        Approximate quantiles, with shape np.shape(q) + shape.
+        """
+        values = np.array([digest.quantile(q) for digest in self.digests])
+        return np.moveaxis(values, 0, -1).reshape(np.shape(q) + self.shape)
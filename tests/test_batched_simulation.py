@@ -0,0 +1,107 @@
+import unittest
+import numpy as np
+from mathematical_model import GameParameters, Game
+from batched_simulation import ROLES, draw_rounds, draw_uniforms, settle_rounds, simulate_games, compare_parameter_sets
+
+
+class TestBatchedSimulation(unittest.TestCase):
+    def setUp(self):
+        self.params = GameParameters()
+        self.rounds = draw_rounds(50, self.params.max_bet, rng=np.random.default_rng(3))
+
+    def test_settle_rounds_matches_game(self):
+        l1, l2, scores, reps, profits = settle_rounds(self.params, self.rounds)
+        for g in range(50):
+            game = Game(self.params, time_constraint=10)
+            layer1_bets = list(self.rounds['layer1_bets'][g])
+            layer2_bets = list(self.rounds['layer2_bets'][g])
+            predictions = list(self.rounds['layer2_predictions'][g])
+            outcome = bool(self.rounds['layer1_outcome'][g])
+            for player, role_index in zip(game.layer2_players, self.rounds['role_order'][g]):
+                player.role = ROLES[role_index]
+
+            layer1_payoffs = game._calculate_layer1_payoffs(layer1_bets, outcome)
+            layer2_payoffs = game._calculate_layer2_payoffs(layer2_bets, outcome, predictions)
+            game.update_community_score(layer1_bets + layer2_bets)
+            game.update_reputations(layer1_bets + layer2_bets, layer1_payoffs + layer2_payoffs)
+
+            np.testing.assert_allclose(l1[g], layer1_payoffs)
+            np.testing.assert_allclose(l2[g], layer2_payoffs)
+            self.assertAlmostEqual(scores[g], game.community_score)
+            np.testing.assert_allclose(reps[g], [p.reputation for p in game.layer1_players + game.layer2_players])
+            np.testing.assert_allclose(profits[g], layer1_payoffs + layer2_payoffs)
+
+    def test_expected_round_payoffs_enumerate_every_case(self):
+        game = Game(self.params, time_constraint=10)
+        bets = np.array([10.0, 35.0, 20.0, 60.0, 75.0])
+        distribution = game.expected_round_payoffs(bets)
+        self.assertEqual(distribution['payoffs'].shape, (2 * 8 * 6, 5))
+        self.assertAlmostEqual(distribution['probabilities'].sum(), 1.0)
+        self.assertEqual(len({(o, tuple(p), tuple(r)) for o, p, r in zip(
+            distribution['outcome'], distribution['predictions'], distribution['role_order'])}), 96)
+
+        for case in range(0, 96, 7):
+            for player, role_index in zip(game.layer2_players, distribution['role_order'][case]):
+                player.role = ROLES[role_index]
+            outcome = bool(distribution['outcome'][case])
+            layer1_payoffs = game._calculate_layer1_payoffs(list(bets[:2]), outcome)
+            layer2_payoffs = game._calculate_layer2_payoffs(list(bets[2:]), outcome, list(distribution['predictions'][case]))
+            np.testing.assert_allclose(distribution['payoffs'][case], layer1_payoffs + layer2_payoffs)
+
+        payoffs = distribution['payoffs']
+        np.testing.assert_allclose(distribution['expected'], payoffs.mean(axis=0))
+        np.testing.assert_allclose(distribution['variance'], payoffs.var(axis=0))
+
+    def test_expected_round_payoffs_match_sampled_rounds(self):
+        game = Game(self.params, time_constraint=10)
+        bets = np.array([10.0, 35.0, 20.0, 60.0, 75.0])
+        rounds = draw_rounds(200000, self.params.max_bet, rng=np.random.default_rng(0))
+        rounds['layer1_bets'][:] = bets[:2]
+        rounds['layer2_bets'][:] = bets[2:]
+        profits = settle_rounds(self.params, rounds)[4]
+        distribution = game.expected_round_payoffs(bets)
+        std_errors = np.sqrt(distribution['variance'] / len(profits))
+        self.assertTrue(np.all(np.abs(profits.mean(axis=0) - distribution['expected']) < 4 * std_errors))
+
+    def test_simulate_games_shapes(self):
+        histories = simulate_games(self.params, 1000, rng=np.random.default_rng(0), chunk_size=300)
+        self.assertEqual([h.shape for h in histories], [(1000, 2), (1000, 3), (1000,), (1000, 5), (1000, 5)])
+        self.assertTrue(np.all(histories[1] >= 0))
+
+    def test_player_counts_come_from_params(self):
+        params = GameParameters(n_players=8, n_base_players=3)
+        histories = simulate_games(params, 200, rng=np.random.default_rng(0))
+        self.assertEqual([h.shape for h in histories], [(200, 3), (200, 5), (200,), (200, 8), (200, 8)])
+
+    def test_antithetic_draws_mirror_each_other(self):
+        uniforms = draw_uniforms(11, rng=np.random.default_rng(0), antithetic=True)
+        self.assertEqual(uniforms['layer2_bets'].shape, (11, 3))
+        np.testing.assert_allclose(uniforms['layer1_bets'][1::2], 1 - uniforms['layer1_bets'][0:10:2])
+        rounds = draw_rounds(10, 80, rng=np.random.default_rng(0), antithetic=True)
+        np.testing.assert_array_equal(rounds['layer1_outcome'][1::2], ~rounds['layer1_outcome'][::2])
+        np.testing.assert_array_equal(rounds['role_order'][1::2], rounds['role_order'][::2, ::-1])
+
+    def test_common_random_numbers_shrink_standard_errors(self):
+        parameter_sets = [GameParameters(observer_multiplier=1.3), GameParameters(observer_multiplier=1.4)]
+        independent = compare_parameter_sets(parameter_sets, 20000, common_random_numbers=False, rng=np.random.default_rng(0))
+        common = compare_parameter_sets(parameter_sets, 20000, rng=np.random.default_rng(0))
+        np.testing.assert_array_equal(common['differences'][0], 0)
+        self.assertLess(common['std_errors'][1, 2] * 10, independent['std_errors'][1, 2])
+        self.assertLess(abs(common['differences'][1, 2] - independent['differences'][1, 2]), 3 * independent['std_errors'][1, 2])
+
+    def test_seeded_games_are_reproducible(self):
+        games = [Game(self.params, 10, rng=np.random.default_rng(5)) for _ in range(2)]
+        np.testing.assert_array_equal(games[0].players.sigma, games[1].players.sigma)
+        self.assertEqual(games[0].run_game(), games[1].run_game())
+
+    def test_global_seed_makes_unseeded_runs_reproducible(self):
+        runs = []
+        for _ in range(2):
+            np.random.seed(11)
+            runs.append(simulate_games(self.params, 100))
+        for first, second in zip(*runs):
+            np.testing.assert_array_equal(first, second)
+
+
+if __name__ == '__main__':
+    unittest.main()
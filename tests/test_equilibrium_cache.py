@@ -0,0 +1,53 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from mathematical_model import GameParameters, Game
+from equilibrium_cache import EquilibriumCache
+from nash_equilibrium_solver import SOLVER_VERSION, analyze_equilibria
+
+
+class TestEquilibriumCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.directory = os.path.join(self.tmpdir.name, 'cache')
+        self.type_distributions = [[0.7, 0.3] for _ in range(5)]
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_key_depends_on_every_input(self):
+        key = EquilibriumCache.key(GameParameters(), 10, self.type_distributions, SOLVER_VERSION)
+        self.assertEqual(key, EquilibriumCache.key(GameParameters(), 10, self.type_distributions, SOLVER_VERSION))
+        self.assertNotEqual(key, EquilibriumCache.key(GameParameters(alpha=0.2), 10, self.type_distributions, SOLVER_VERSION))
+        self.assertNotEqual(key, EquilibriumCache.key(GameParameters(), 20, self.type_distributions, SOLVER_VERSION))
+        self.assertNotEqual(key, EquilibriumCache.key(GameParameters(), 10, [[0.6, 0.4]] * 5, SOLVER_VERSION))
+        self.assertNotEqual(key, EquilibriumCache.key(GameParameters(), 10, self.type_distributions, SOLVER_VERSION + 1))
+
+    def test_results_persist_on_disk_and_evict_from_memory(self):
+        cache = EquilibriumCache(self.directory, max_entries=1)
+        results = (np.arange(5.0), np.ones((5, 2)), None)
+        cache.put('a', results)
+        cache.put('b', results)
+        self.assertEqual(cache.stats()['entries'], 1)
+
+        reloaded = EquilibriumCache(self.directory).get('a')
+        np.testing.assert_array_equal(reloaded[0], results[0])
+        np.testing.assert_array_equal(reloaded[1], results[1])
+        self.assertIsNone(reloaded[2])
+        self.assertIsNone(cache.get('c'))
+        self.assertEqual((cache.hits, cache.misses), (0, 1))
+
+    def test_analyze_equilibria_reuses_cached_results(self):
+        np.random.seed(0)
+        cache = EquilibriumCache(self.directory)
+        game = Game(GameParameters(), time_constraint=10)
+        first = analyze_equilibria(game, self.type_distributions, cache=cache)
+        second = analyze_equilibria(Game(GameParameters(), time_constraint=10), self.type_distributions, cache=cache)
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+        np.testing.assert_array_equal(first[0], second[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import json
+import os
+import tempfile
+import unittest
+import numpy as np
+from equilibrium_index import EquilibriumIndex, build_equilibrium_index, load_equilibrium_index
+from nash_equilibrium_solver import SOLVER_VERSION
+import app as app_module
+
+
+class TestEquilibriumIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.directory = os.path.join(self.tmpdir.name, 'index')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _write_linear_index(self, solver_version=SOLVER_VERSION):
+        # Strategies linear in each parameter, which multilinear interpolation reproduces exactly
+        alphas, times = np.array([0.05, 0.1, 0.2]), np.array([10.0, 20.0])
+        ne = 100 * alphas[:, None, None] + times[None, :, None] + np.arange(5.0)
+        os.makedirs(self.directory)
+        np.save(os.path.join(self.directory, 'ne.npy'), ne)
+        np.save(os.path.join(self.directory, 'bne.npy'), np.repeat(ne[..., None], 2, axis=-1))
+        with open(os.path.join(self.directory, 'meta.json'), 'w') as f:
+            json.dump({'axes': {'alpha': alphas.tolist(), 'time_constraint': times.tolist()},
+                       'solver_version': solver_version}, f)
+
+    def test_interpolation_and_error_bound(self):
+        self._write_linear_index()
+        index = EquilibriumIndex(self.directory)
+        self.assertIsInstance(index.arrays['ne'], np.memmap)
+
+        ne, bound = index.query(alpha=0.15, time_constraint=12)['ne']
+        np.testing.assert_allclose(ne, 15 + 12 + np.arange(5.0))
+        np.testing.assert_allclose(bound, np.full(5, 10 + 10))
+        bne, _ = index.query(alpha=0.15, time_constraint=12)['bne']
+        self.assertEqual(bne.shape, (5, 2))
+
+        ne, bound = index.query(alpha=0.1, time_constraint=20)['ne']
+        np.testing.assert_allclose(ne, 10 + 20 + np.arange(5.0))
+        np.testing.assert_array_equal(bound, np.zeros(5))
+
+    def test_rejects_points_outside_the_index(self):
+        self._write_linear_index()
+        index = EquilibriumIndex(self.directory)
+        for values in ({'alpha': 0.3, 'time_constraint': 10}, {'alpha': 0.1},
+                       {'alpha': 0.1, 'time_constraint': 10, 'beta': 0.05}):
+            with self.assertRaises(ValueError):
+                index.query(**values)
+
+    def test_rejects_index_from_another_solver_version(self):
+        self._write_linear_index(solver_version=SOLVER_VERSION - 1)
+        with self.assertRaises(ValueError):
+            EquilibriumIndex(self.directory)
+        self.assertIsNone(load_equilibrium_index(self.directory))
+
+    def test_build_matches_solved_grid_points(self):
+        build_equilibrium_index(self.directory, grid={'alpha': [0.05, 0.1]}, time_constraints=(10, 20))
+        index = load_equilibrium_index(self.directory)
+        self.assertEqual(index.arrays['ne'].shape, (2, 2, 5))
+        self.assertEqual(index.arrays['bne'].shape, (2, 2, 5, 2))
+        ne, bound = index.query(alpha=0.05, time_constraint=20)['ne']
+        np.testing.assert_array_equal(ne, index.arrays['ne'][0, 1])
+        self.assertTrue(np.all((ne >= 0) & (ne <= 80)))
+        with self.assertRaises(ValueError):
+            build_equilibrium_index(self.directory, grid={'n_players': [5, 6]})
+
+    def test_endpoint(self):
+        self._write_linear_index()
+        client = app_module.app.test_client()
+        saved = app_module.equilibrium_index
+        try:
+            app_module.equilibrium_index = load_equilibrium_index(os.path.join(self.tmpdir.name, 'missing'))
+            self.assertEqual(client.get('/equilibrium?alpha=0.1&time_constraint=10').status_code, 503)
+
+            app_module.equilibrium_index = load_equilibrium_index(self.directory)
+            response = client.get('/equilibrium?alpha=0.15&time_constraint=12')
+            self.assertEqual(response.status_code, 200)
+            np.testing.assert_allclose(response.get_json()['ne']['strategy'], 15 + 12 + np.arange(5.0))
+            self.assertEqual(client.get('/equilibrium?alpha=1&time_constraint=10').status_code, 400)
+        finally:
+            app_module.equilibrium_index = saved
+
+
+if __name__ == '__main__':
+    unittest.main()
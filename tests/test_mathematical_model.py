@@ -1,7 +1,7 @@
 import unittest
 from unittest.mock import Mock
 import numpy as np
-from ..mathematical_model import GameParameters, Player, Game
+from mathematical_model import GameParameters, Player, PlayerTable, Game
 
 
 class TestGameParameters(unittest.TestCase):
@@ -55,6 +55,17 @@ class TestPlayer(unittest.TestCase):
         self.player.update_cumulative_profit(-50)
         self.assertEqual(self.player.cumulative_profit, 50)
 
+    def test_player_view_writes_through_to_table(self):
+        table = PlayerTable(3)
+        player = Player.view(table, 1, game=None)
+        player.reputation = 0.8
+        player.role = 'validator'
+        player.make_prediction(True)
+        self.assertEqual(table.reputation[1], 0.8)
+        self.assertEqual(player.role, 'validator')
+        self.assertTrue(player.prediction)
+        self.assertEqual(table.prediction.tolist(), [-1, 1, -1])
+
 class TestGame(unittest.TestCase):
     def setUp(self):
         params = GameParameters()
@@ -68,6 +79,30 @@ class TestGame(unittest.TestCase):
         self.assertEqual(self.game.community_score, 50)
         self.assertEqual(self.game.roles, ['bank', 'odd_setter', 'validator'])
 
+    def test_game_honours_player_counts(self):
+        game = Game(GameParameters(n_players=12, n_base_players=4), time_constraint=100)
+        self.assertEqual(len(game.layer1_players), 4)
+        self.assertEqual(len(game.layer2_players), 8)
+        self.assertEqual(len(game.players), 12)
+        layer1_payoffs, layer2_payoffs = game.run_game()
+        self.assertEqual((len(layer1_payoffs), len(layer2_payoffs)), (4, 8))
+        with self.assertRaises(ValueError):
+            Game(GameParameters(n_players=3, n_base_players=4), time_constraint=100)
+
+    def test_deviation_payoffs_match_payoff_vector(self):
+        np.random.seed(5)
+        game = Game(GameParameters(n_players=40, n_base_players=2), time_constraint=100)
+        X = np.random.uniform(1, 79, 40)
+        bets = np.linspace(0, 80, 9)
+        players = [0, 1, 17, 39]
+        deviations = game.deviation_payoffs(X, players, bets)
+        for j, i in enumerate(players):
+            for k, bet in enumerate(bets):
+                X_copy = X.copy()
+                X_copy[i] = bet
+                self.assertAlmostEqual(deviations[j, k], game.payoff_vector(X_copy)[i], places=8)
+                self.assertAlmostEqual(game._pi_i(bet, X_copy, i), game.payoff_vector(X_copy)[i], places=8)
+
     def test_run_game(self):
         np.random.seed(42)  # Set seed for reproducibility
         layer1_payoffs, layer2_payoffs = self.game.run_game()
@@ -103,6 +138,13 @@ class TestGame(unittest.TestCase):
         final_reputations = [player.reputation for player in self.game.layer1_players + self.game.layer2_players]
         self.assertNotEqual(initial_reputations, final_reputations)
 
+    def test_players_share_game_table(self):
+        self.assertEqual(len(self.game.players), 5)
+        self.game.update_cumulative_profits([1, 2, 3, 4, 5])
+        self.assertEqual([p.cumulative_profit for p in self.game.layer1_players + self.game.layer2_players], [1, 2, 3, 4, 5])
+        self.game.layer2_players[0].sigma = 2.0
+        self.assertEqual(self.game.players.sigma[2], 2.0)
+
     def test_pi_i(self):
         player = self.game.layer1_players[0]
         X = [10, 20, 30, 40, 50]
@@ -110,6 +152,18 @@ class TestGame(unittest.TestCase):
         self.assertIsInstance(payoff, float)
         self.assertGreater(payoff, 0)
 
+    def test_payoff_vector_matches_pi_i(self):
+        X = np.array([10.0, 20.0, 30.0, 40.0, 50.0])
+        expected = [self.game._pi_i(X[i], X, i) for i in range(len(X))]
+        np.testing.assert_allclose(self.game.payoff_vector(X), expected, rtol=1e-12)
+
+    def test_payoff_vector_batched(self):
+        batch = np.random.uniform(1, 80, size=(4, 5))
+        payoffs = self.game.payoff_vector(batch)
+        self.assertEqual(payoffs.shape, (4, 5))
+        for row, X in zip(payoffs, batch):
+            np.testing.assert_allclose(row, [self.game._pi_i(X[i], X, i) for i in range(len(X))], rtol=1e-12)
+
     def test_cost_function(self):
         cost = self.game._cost_function(50)
         self.assertGreater(cost, 0)
@@ -0,0 +1,63 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from mathematical_model import GameParameters, Game
+from equilibrium_cache import EquilibriumCache
+from model_analysis import population_fitness, _crossover, run_island_simulation, run_adaptive_simulation
+
+
+class TestEvolutionarySimulation(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(2)
+        self.params = GameParameters()
+        self.game = Game(self.params, time_constraint=10)
+        self.population = np.random.rand(self.params.n_players, 200) * self.params.max_bet
+
+    def test_population_fitness_matches_individual_evaluation(self):
+        fitnesses = population_fitness(self.game, self.population)
+        for i in range(0, 200, 17):
+            strategy = self.population[:, i]
+            payoff = sum(self.game._pi_i(strategy[j], strategy, j) for j in range(len(strategy)))
+            alignment = 1 - np.mean(abs(strategy - np.mean(strategy)) / np.mean(strategy))
+            expected = max(0, payoff + self.params.community_factor * alignment * np.mean(strategy) * 5)
+            self.assertAlmostEqual(fitnesses[i], expected, places=8)
+
+    def test_crossover_only_exchanges_strategies_within_rows(self):
+        crossed = _crossover(self.population.copy())
+        np.testing.assert_allclose(np.sort(crossed, axis=1), np.sort(self.population, axis=1))
+        self.assertGreater(np.sum(crossed != self.population), 0)
+
+    def test_island_histories(self):
+        with tempfile.TemporaryDirectory() as directory:
+            avg_strategy_history, nash_distance_history, island_history = run_island_simulation(
+                self.params, 10, num_generations=6, n_islands=3, population_size=100, migration_interval=2, n_migrants=5,
+                cache=EquilibriumCache(directory))
+            self.assertEqual(len(os.listdir(directory)), 1)
+        self.assertEqual(avg_strategy_history.shape, (6, self.params.n_players))
+        self.assertEqual(nash_distance_history.shape, (6,))
+        self.assertEqual(island_history.shape, (3, 6))
+        self.assertTrue(np.all(avg_strategy_history >= 0))
+        self.assertTrue(np.all(nash_distance_history <= island_history.max(axis=0) + 1e-9))
+
+    def test_adaptive_simulation_stops_at_requested_precision(self):
+        accumulators, half_widths = run_adaptive_simulation(self.params, 0.5, batch_size=2000, rng=np.random.default_rng(0))
+        self.assertTrue(all(half_width <= 0.5 for half_width in half_widths.values()))
+        self.assertGreater(accumulators[0].count, 2000)
+        self.assertEqual(accumulators[2].count, accumulators[0].count)
+
+        accumulators, half_widths = run_adaptive_simulation(self.params, 0.01, batch_size=2000, max_simulations=5000,
+                                                            rng=np.random.default_rng(0))
+        self.assertEqual(accumulators[0].count, 5000)
+        self.assertGreater(half_widths['layer2_profit'], 0.01)
+
+    def test_adaptive_simulation_rejects_invalid_budgets(self):
+        for kwargs in ({'max_simulations': 0}, {'max_simulations': -5}, {'batch_size': 0}, {'batch_size': 1}):
+            with self.assertRaises(ValueError):
+                run_adaptive_simulation(self.params, 0.5, **kwargs)
+        with self.assertRaises(ValueError):
+            run_adaptive_simulation(self.params, {'layer1_profit': 0.0})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,258 @@
+import unittest
+import numpy as np
+from scipy.optimize import approx_fprime
+from mathematical_model import GameParameters, Game
+from nash_equilibrium_solver import (objective, objective_gradient, TypeProfiles, SampledTypeProfiles, exchangeable_groups,
+                                     nash_regrets, solve_nash_equilibrium_best_response, solve_nash_equilibrium_portfolio,
+                                     bayesian_nash_regrets, is_bayesian_nash_equilibrium, is_nash_equilibrium,
+                                     solve_community_focused_bne, _community_benefit, solve_mean_field_equilibrium,
+                                     solve_continuation, _game_at, _expected_objective)
+
+
+class TestPayoffGradients(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(7)
+        self.game = Game(GameParameters(), time_constraint=30)
+        self.game.layer2_players[0].role = 'bank'
+
+    def test_objective_gradient_matches_finite_differences(self):
+        for _ in range(5):
+            X = np.random.uniform(1, 79, 5)
+            numeric = approx_fprime(X, objective, 1e-6, self.game)
+            np.testing.assert_allclose(objective_gradient(X, self.game), numeric, atol=1e-4)
+
+    def test_own_payoff_gradient_matches_finite_differences(self):
+        X = np.random.uniform(1, 79, 5)
+        sigma = np.random.uniform(0.5, 1.5, 5)
+        for i in range(5):
+            def payoff(x):
+                X_copy = X.copy()
+                X_copy[i] = x[0]
+                return self.game.payoff_vector(X_copy, sigma=sigma)[i]
+            numeric = approx_fprime([X[i]], payoff, 1e-6)[0]
+            self.assertAlmostEqual(self.game.own_payoff_gradient(X, sigma=sigma)[i], numeric, delta=1e-4)
+
+
+class TestBestResponseSolver(unittest.TestCase):
+    def test_best_response_iteration_reaches_zero_exploitability(self):
+        np.random.seed(4)
+        game = Game(GameParameters(), time_constraint=10)
+        initial_guess = np.random.uniform(0, 80, 5)
+        self.assertGreater(nash_regrets(game, initial_guess).sum(), 1.0)
+        for update in ('gauss-seidel', 'jacobi'):
+            result = solve_nash_equilibrium_best_response(game, update=update, damping=0.2, initial_guess=initial_guess)
+            self.assertTrue(result.success)
+            self.assertLess(result.exploitability, 1e-3)
+            np.testing.assert_allclose(result.regrets, nash_regrets(game, result.x))
+
+    def test_rejects_non_positive_max_iter(self):
+        game = Game(GameParameters(), time_constraint=10)
+        with self.assertRaises(ValueError):
+            solve_nash_equilibrium_best_response(game, max_iter=0)
+
+
+class TestMeanFieldSolver(unittest.TestCase):
+    def test_mean_field_bets_are_nash_in_a_large_finite_game(self):
+        np.random.seed(8)
+        game = Game(GameParameters(n_players=302), time_constraint=10)
+        result = solve_mean_field_equilibrium(game)
+        self.assertTrue(result.success)
+        self.assertEqual(result.x.shape, (16,))
+        self.assertAlmostEqual(result.weights.sum(), 1.0)
+        X = np.concatenate([result.layer1_bets, np.interp(game.players.sigma[2:], result.sigma, result.x)])
+        self.assertLess(nash_regrets(game, X).max(), 1e-3)
+
+    def test_population_size_only_enters_through_the_aggregates(self):
+        game = Game(GameParameters(), time_constraint=10)
+        result = solve_mean_field_equilibrium(game, sigma=[0.6, 1.0, 1.4], reputation=[0.2, 0.5, 0.8],
+                                              weights=[1, 2, 1], n_observers=10**6)
+        self.assertTrue(result.success)
+        np.testing.assert_allclose(result.weights, [0.25, 0.5, 0.25])
+        self.assertTrue(np.all((result.x >= 0) & (result.x <= game.max_bet)))
+        self.assertLess(result.regrets.max(), 1e-6)
+
+
+class TestPortfolioSolver(unittest.TestCase):
+    def test_portfolio_reports_method_and_attempts(self):
+        np.random.seed(1)
+        game = Game(GameParameters(), time_constraint=10)
+        result = solve_nash_equilibrium_portfolio(game, n_starts=2, include_global=False, max_workers=2, seed=0)
+        self.assertTrue(result.success)
+        self.assertIn(result.method, ('L-BFGS-B', 'SLSQP', 'TNC'))
+        self.assertGreaterEqual(len(result.attempts), 1)
+        self.assertAlmostEqual(result.fun, objective(result.x, game), places=6)
+        self.assertTrue(all(attempt['time'] >= 0 for attempt in result.attempts))
+
+    def test_portfolio_reports_attempts_that_fail_to_start(self):
+        np.random.seed(1)
+        game = Game(GameParameters(), time_constraint=10)
+        game.unpicklable = lambda: None
+        result = solve_nash_equilibrium_portfolio(game, n_starts=1, include_global=False, max_workers=2)
+        self.assertFalse(result.success)
+        self.assertEqual(len(result.attempts), 3)
+        self.assertTrue(all(not attempt['success'] for attempt in result.attempts))
+
+
+class TestContinuation(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(0)
+        self.game = Game(GameParameters(), time_constraint=10)
+
+    def test_warm_start_needs_fewer_evaluations_and_is_no_worse(self):
+        alphas = np.linspace(0.05, 0.5, 20)
+        warm = solve_continuation(self.game, 'alpha', alphas)
+        cold = solve_continuation(self.game, 'alpha', alphas, warm_start=False)
+        self.assertEqual(warm.x.shape, (20, 5))
+        self.assertLess(warm.total_nfev, cold.total_nfev)
+        for alpha, x_warm, x_cold in zip(alphas, warm.x, cold.x):
+            game = _game_at(self.game, 'alpha', alpha)
+            self.assertLessEqual(objective(x_warm, game), objective(x_cold, game) + 1e-6)
+
+    def test_reports_jumps_between_branches(self):
+        result = solve_continuation(self.game, 'community_factor', np.linspace(1, 5, 8))
+        self.assertIn(1, result.jumps)
+
+    def test_bayesian_path_and_unknown_parameter(self):
+        type_distributions = [[0.5, 0.5]] * len(self.game.players)
+        result = solve_continuation(self.game, 'alpha', [0.1, 0.12], solver='bayesian',
+                                    type_distributions=type_distributions)
+        self.assertEqual(result.x.shape, (2, 5, 2))
+        with self.assertRaises(ValueError):
+            solve_continuation(self.game, 'no_such_parameter', [0.1])
+
+
+class TestEquilibriumVerification(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(4)
+        self.game = Game(GameParameters(), time_constraint=10)
+        self.type_distributions = [[0.5, 0.3, 0.2] for _ in range(5)]
+
+    def test_nash_regrets_match_in_process_pool(self):
+        X = np.random.uniform(0, 80, 5)
+        regrets = nash_regrets(self.game, X)
+        self.assertTrue(np.all(regrets > 0))
+        np.testing.assert_allclose(nash_regrets(self.game, X, max_workers=2), regrets)
+        self.assertFalse(is_nash_equilibrium(self.game, X))
+        self.assertTrue(is_nash_equilibrium(self.game, np.full(5, 40.0)))
+
+    def test_bayesian_regrets_shape_and_pool(self):
+        strategies = np.random.uniform(1, 79, (5, 3))
+        regrets = bayesian_nash_regrets(self.game, strategies, self.type_distributions)
+        self.assertEqual(regrets.shape, (5, 3))
+        self.assertGreater(regrets.max(), 1.0)
+        np.testing.assert_allclose(bayesian_nash_regrets(self.game, strategies, self.type_distributions, max_workers=3),
+                                   regrets)
+        self.assertFalse(is_bayesian_nash_equilibrium(self.game, strategies, self.type_distributions))
+
+    def test_exchangeable_regrets_match_full_check(self):
+        strategies = np.repeat(np.random.uniform(1, 79, (1, 3)), 5, axis=0)
+        full = bayesian_nash_regrets(self.game, strategies, self.type_distributions)
+        reduced = bayesian_nash_regrets(self.game, strategies, self.type_distributions, exchangeable=True)
+        np.testing.assert_allclose(reduced, full, atol=1e-6)
+
+
+class TestCommunityFocusedBNE(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(6)
+        self.game = Game(GameParameters(), time_constraint=10)
+        self.type_distributions = [[0.7, 0.3] for _ in range(5)]
+
+    def test_community_benefit_gradient_matches_finite_differences(self):
+        X = np.random.uniform(1, 79, 5)
+        numeric = approx_fprime(X, lambda X: _community_benefit(self.game, X[None])[0][0], 1e-6)
+        np.testing.assert_allclose(_community_benefit(self.game, X[None])[1][0], numeric, atol=1e-4)
+
+    def test_solves_within_bounds(self):
+        cbne = solve_community_focused_bne(self.game, self.type_distributions)
+        self.assertEqual(cbne.shape, (5, 2))
+        self.assertTrue(np.all((cbne >= 0) & (cbne <= self.game.max_bet)))
+        reduced = solve_community_focused_bne(self.game, self.type_distributions, exchangeable=True)
+        self.assertEqual(reduced.shape, (5, 2))
+
+
+class TestTypeProfiles(unittest.TestCase):
+    def test_expected_payoff_matches_per_profile_games(self):
+        np.random.seed(11)
+        game = Game(GameParameters(), time_constraint=20)
+        type_distributions = [[0.5, 0.3, 0.2] for _ in range(5)]
+        strategies = np.random.uniform(1, 79, (5, 3))
+        types = TypeProfiles(type_distributions, 5)
+        self.assertAlmostEqual(types.probs.sum(), 1.0)
+
+        expected = 0.0
+        for type_combo in np.ndindex(*[3] * 5):
+            prob = np.prod([type_distributions[i][t] for i, t in enumerate(type_combo)])
+            game_instance = Game(game.params, game.time_constraint)
+            game_instance.layer1_players = [player.copy() for player in game.layer1_players]
+            game_instance.layer2_players = [player.copy() for player in game.layer2_players]
+            for player, t in zip(game_instance.layer1_players + game_instance.layer2_players, type_combo):
+                player.sigma = 1 + 0.5 * t
+            X = [strategies[i, t] for i, t in enumerate(type_combo)]
+            expected += prob * sum(game_instance._pi_i(X[i], X, i) for i in range(5))
+
+        tabulated = types.probs @ game.payoff_vector(types.bets(strategies), sigma=types.sigma).sum(axis=1)
+        self.assertAlmostEqual(tabulated, expected, places=6)
+
+    def test_exchangeable_multisets_match_full_enumeration(self):
+        np.random.seed(5)
+        game = Game(GameParameters(), time_constraint=20)
+        type_distributions = [[0.5, 0.3, 0.2] for _ in range(5)]
+        groups = exchangeable_groups(game, type_distributions)
+        self.assertEqual(groups, [[0, 1], [2, 3, 4]])
+
+        full = TypeProfiles(type_distributions, 5)
+        reduced = TypeProfiles(type_distributions, 5, groups)
+        self.assertEqual(len(reduced.probs), 6 * 10)
+        self.assertAlmostEqual(reduced.probs.sum(), 1.0)
+
+        strategies = reduced.expand(np.random.uniform(1, 79, (2, 3)))
+        expected = [types.probs @ game.payoff_vector(types.bets(strategies), sigma=types.sigma).sum(axis=1)
+                    for types in (full, reduced)]
+        self.assertAlmostEqual(expected[0], expected[1], places=8)
+
+    def test_sampled_expectation_within_error_estimate(self):
+        np.random.seed(5)
+        game = Game(GameParameters(), time_constraint=20)
+        type_distributions = [[0.5, 0.3, 0.2] for _ in range(5)]
+        strategies = np.random.uniform(1, 79, (5, 3))
+        full = TypeProfiles(type_distributions, 5)
+        exact = full.probs @ game.payoff_vector(full.bets(strategies), sigma=full.sigma).sum(axis=1)
+
+        for sampler in ('sobol', 'lhs'):
+            sampled = SampledTypeProfiles(type_distributions, 5, n_samples=2048, sampler=sampler, seed=0)
+            totals = game.payoff_vector(sampled.bets(strategies), sigma=sampled.sigma).sum(axis=1)
+            self.assertEqual(len(totals), 2048)
+            self.assertLess(abs(sampled.probs @ totals - exact), 5 * sampled.std_error(totals) + 1e-9)
+
+    def test_vectorized_expected_objective_matches_each_candidate(self):
+        np.random.seed(7)
+        game = Game(GameParameters(), time_constraint=10)
+        types = TypeProfiles([[0.7, 0.3] for _ in range(5)], 5)
+        candidates = np.random.uniform(0, 80, (10, 6))
+        values = _expected_objective(candidates, game, types)
+        for k in range(candidates.shape[1]):
+            bets = types.bets(candidates[:, k].reshape(5, 2))
+            expected = -types.probs @ game.payoff_vector(bets, sigma=types.sigma).sum(axis=1)
+            self.assertAlmostEqual(values[k], expected, places=6)
+        self.assertEqual(_expected_objective(candidates, game, types, community=True).shape, (6,))
+
+    def test_large_exchangeable_group_matches_sampled_estimate(self):
+        np.random.seed(6)
+        game = Game(GameParameters(n_players=25, n_base_players=2), time_constraint=20)
+        type_distributions = [[0.6, 0.4] for _ in range(25)]
+        groups = exchangeable_groups(game, type_distributions)
+        self.assertEqual(sorted(len(members) for members in groups), [2, 23])
+        strategies = np.random.uniform(1, 79, (len(groups), 2))
+
+        reduced = TypeProfiles(type_distributions, 25, groups)
+        self.assertAlmostEqual(reduced.probs.sum(), 1.0)
+        per_player = reduced.expand(strategies)
+        exact = reduced.probs @ game.payoff_vector(reduced.bets(per_player), sigma=reduced.sigma).sum(axis=1)
+
+        sampled = SampledTypeProfiles(type_distributions, 25, n_samples=4096, seed=0)
+        totals = game.payoff_vector(sampled.bets(per_player), sigma=sampled.sigma).sum(axis=1)
+        self.assertLess(abs(sampled.probs @ totals - exact), 5 * sampled.std_error(totals) + 1e-9)
+
+
+if __name__ == '__main__':
+    unittest.main()
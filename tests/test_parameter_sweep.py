@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from parameter_sweep import expand_parameter_sets, expand_values, point_key, run_sweep
+
+
+def fake_evaluate(point):
+    if point['game_parameters']['alpha'] < 0:
+        raise ValueError("negative alpha")
+    return {"alpha": point['game_parameters']['alpha'], "draw": np.random.rand()}
+
+
+class TestParameterSweep(unittest.TestCase):
+    def setUp(self):
+        self.parameter_sets = [
+            {"game_parameters": {"alpha": [0.1, 0.2, 0.3], "beta": {"start": 0.0, "stop": 0.1, "num": 3}},
+             "time_constraint": {"start": 10, "stop": 30, "step": 10}},
+            {"game_parameters": {"alpha": 0.5, "observer_multiplier": 1.3}, "time_constraint": 10},
+        ]
+
+    def test_expand_parameter_sets(self):
+        points = expand_parameter_sets(self.parameter_sets)
+        self.assertEqual(len(points), 3 * 3 * 3 + 1)
+        self.assertEqual(points[0], {"game_parameters": {"alpha": 0.1, "beta": 0.0}, "time_constraint": 10})
+        self.assertEqual(points[-1], {"game_parameters": {"alpha": 0.5, "observer_multiplier": 1.3}, "time_constraint": 10})
+
+    def test_ranges_include_stop(self):
+        self.assertEqual(expand_values({"start": 10, "stop": 30, "step": 10}), [10, 20, 30])
+        np.testing.assert_allclose(expand_values({"start": 0.1, "stop": 0.3, "step": 0.1}), [0.1, 0.2, 0.3])
+        self.assertEqual(expand_values({"start": 0.0, "stop": 0.1, "num": 3}), [0.0, 0.05, 0.1])
+
+    def test_point_key_depends_on_solver_version(self):
+        point = {"game_parameters": {"alpha": 0.1}, "time_constraint": 10}
+        self.assertEqual(point_key(point), point_key(point))
+        self.assertNotEqual(point_key(point), point_key(point, solver_version=0))
+
+    def test_sweep_resumes_from_checkpoints(self):
+        with tempfile.TemporaryDirectory() as checkpoint_dir:
+            parameter_sets = self.parameter_sets + [{"game_parameters": {"alpha": -1.0}, "time_constraint": 10}]
+            points, results = run_sweep(parameter_sets, checkpoint_dir, max_workers=2, evaluate=fake_evaluate)
+            self.assertEqual(len(points), 28)
+            self.assertEqual([r["alpha"] for r in results], [p['game_parameters']['alpha'] for p in points])
+            self.assertEqual(len(os.listdir(checkpoint_dir)), 28)
+
+            # Draws are seeded per point and checkpointed results are reused
+            self.assertEqual(len({r["draw"] for r in results}), 28)
+            resumed_points, resumed = run_sweep(parameter_sets, checkpoint_dir, max_workers=2, evaluate=fake_evaluate)
+            self.assertEqual(resumed_points, points)
+            self.assertEqual([r["draw"] for r in resumed], [r["draw"] for r in results])
+
+
+if __name__ == '__main__':
+    unittest.main()
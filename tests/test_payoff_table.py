@@ -0,0 +1,51 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from mathematical_model import GameParameters, Game
+from payoff_table import PayoffTable
+from nash_equilibrium_solver import nash_regrets, solve_nash_equilibrium_best_response
+
+
+class TestPayoffTable(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(4)
+        self.game = Game(GameParameters(), time_constraint=10)
+        self.table = PayoffTable(self.game)
+
+    def test_table_is_exact_on_grid_nodes(self):
+        # Others' totals at a grid node of the aggregate axes: everyone else bets zero
+        for i in range(5):
+            X = np.zeros(5)
+            X[i] = self.table.grid[40]
+            np.testing.assert_allclose(self.table.deviation_payoffs(X, [i])[0, 40], self.game.payoff_vector(X)[i], rtol=1e-6)
+
+    def test_interpolated_payoffs_track_payoff_vector(self):
+        X = np.random.uniform(1, 79, (500, 5))
+        exact = self.game.payoff_vector(X)
+        errors = np.abs(self.table.payoffs(X) - exact)
+        self.assertLess(np.median(errors), 0.01 * np.abs(exact).mean())
+        self.assertEqual(self.table.payoffs(X[0]).shape, (5,))
+
+    def test_regrets_match_direct_search(self):
+        X = np.random.uniform(0, 80, 5)
+        np.testing.assert_allclose(self.table.regrets(X), nash_regrets(self.game, X), rtol=1e-6, atol=1e-6)
+
+    def test_best_response_solver_with_table(self):
+        result = solve_nash_equilibrium_best_response(self.game, damping=0.2, initial_guess=np.random.uniform(0, 80, 5),
+                                                      table=self.table)
+        self.assertTrue(result.success)
+        self.assertLess(nash_regrets(self.game, result.x).sum(), 1e-3)
+
+    def test_memmapped_table_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'payoffs.npy')
+            PayoffTable(self.game, grid_size=17, aggregate_size=9, path=path)
+            reopened = PayoffTable.open(self.game, path)
+            self.assertIsInstance(reopened.values, np.memmap)
+            self.assertEqual(reopened.values.dtype, np.float32)
+            np.testing.assert_array_equal(reopened.values, PayoffTable(self.game, grid_size=17, aggregate_size=9).values)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+import numpy as np
+from mathematical_model import GameParameters, Game
+from replicator_dynamics import grid_fitness, replicator_dynamics
+
+
+class TestReplicatorDynamics(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(3)
+        self.game = Game(GameParameters(), time_constraint=10)
+        self.grid = np.linspace(0, 80, 9)
+
+    def test_grid_fitness_matches_payoffs_against_expected_bets(self):
+        strategies = np.random.dirichlet(np.ones(9), size=5)
+        fitness = grid_fitness(self.game, strategies, self.grid)
+        expected_bets = strategies @ self.grid
+        for i in range(5):
+            for g in (1, 4, 8):
+                X = expected_bets.copy()
+                X[i] = self.grid[g]
+                self.assertAlmostEqual(fitness[i, g], self.game.payoff_vector(X)[i], places=8)
+
+    def test_histories_have_one_row_per_generation(self):
+        ne = np.full(5, 40.0)
+        avg_strategy_history, nash_distance_history = replicator_dynamics(self.game, ne, num_generations=5, grid_size=21)
+        self.assertEqual(avg_strategy_history.shape, (5, 5))
+        np.testing.assert_allclose(nash_distance_history, np.linalg.norm(avg_strategy_history - ne, axis=1))
+        self.assertTrue(np.all((avg_strategy_history >= 0) & (avg_strategy_history <= 80)))
+
+    def test_strategies_are_sized_by_the_game_players(self):
+        game = Game(GameParameters(n_players=7), time_constraint=10)
+        ne = np.full(len(game.players), 40.0)
+        avg_strategy_history, _ = replicator_dynamics(game, ne, num_generations=2, grid_size=11)
+        self.assertEqual(avg_strategy_history.shape, (2, len(game.players)))
+
+
+if __name__ == '__main__':
+    unittest.main()
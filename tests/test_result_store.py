@@ -0,0 +1,66 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from result_store import ResultStore, save_results, load_results
+from model_analysis import run_simulation, HISTORY_COLUMNS
+
+
+class TestResultStore(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = ResultStore(os.path.join(self.tmpdir.name, 'results'))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_appended_chunks_read_back_as_memmap(self):
+        chunks = [np.random.rand(n, 5) for n in (3, 7, 4)]
+        for chunk in chunks:
+            self.store.append('set', 1, 'reputations', chunk)
+        column = self.store.read('set', 1, 'reputations')
+        self.assertIsInstance(column, np.memmap)
+        np.testing.assert_array_equal(column, np.concatenate(chunks))
+        self.assertEqual(self.store.param_set_ids(), ['set'])
+        self.assertEqual(self.store.run_ids('set'), ['1'])
+        with self.assertRaises(ValueError):
+            self.store.append('set', 1, 'reputations', np.random.rand(2, 4))
+
+    def test_interrupted_append_is_discarded(self):
+        self.store.append('set', 0, 'scores', np.arange(4.0))
+        with open(os.path.join(self.store.directory, 'set', '0', 'scores.bin'), 'ab') as f:
+            f.write(b'partial')
+        self.store.append('set', 0, 'scores', np.arange(4.0, 6.0))
+        np.testing.assert_array_equal(self.store.read('set', 0, 'scores'), np.arange(6.0))
+
+    def test_sweep_results_round_trip(self):
+        points = [{"game_parameters": {"alpha": a}, "time_constraint": 10} for a in (0.3, 0.1)]
+        results = [{"ne": np.full(5, a), "bne": None, "cbne": None, "layer1_profit": 1.0, "layer2_profit": 2.0,
+                    "avg_strategy_history": np.random.rand(10, 5), "nash_distance_history": np.random.rand(10),
+                    "community_score": 50.0} for a in (0.3, 0.1)]
+        save_results(self.store, points, results)
+        save_results(self.store, points, results)
+        loaded_points, loaded = load_results(self.store)
+        self.assertEqual(loaded_points, points)
+        for result, original in zip(loaded, results):
+            np.testing.assert_array_equal(result["avg_strategy_history"], original["avg_strategy_history"])
+            self.assertIsNone(result["bne"])
+            self.assertEqual(result["community_score"], 50.0)
+
+    def test_run_simulation_writes_histories(self):
+        histories = run_simulation(5000, rng=np.random.default_rng(2), store=self.store)
+        expected = run_simulation(5000, rng=np.random.default_rng(2))
+        self.assertEqual(self.store.columns("simulation", 0), sorted(HISTORY_COLUMNS))
+        for history, values in zip(histories, expected):
+            np.testing.assert_array_equal(history, values)
+
+    def test_run_simulation_replaces_earlier_run(self):
+        run_simulation(100, rng=np.random.default_rng(3), store=self.store)
+        histories = run_simulation(100, rng=np.random.default_rng(4), store=self.store)
+        expected = run_simulation(100, rng=np.random.default_rng(4))
+        for history, values in zip(histories, expected):
+            np.testing.assert_array_equal(history, values)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+import numpy as np
+from streaming_stats import StreamingStats
+from model_analysis import run_simulation
+
+
+class TestStreamingStats(unittest.TestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+        self.data = self.rng.normal([0.0, 5.0, -3.0], [1.0, 2.0, 0.5], size=(100000, 3))
+
+    def test_chunked_updates_match_batch_statistics(self):
+        stats = StreamingStats((3,), bins=np.linspace(-5, 10, 31))
+        for chunk in np.array_split(self.data, 7):
+            stats.update(chunk)
+        self.assertEqual(stats.count, len(self.data))
+        np.testing.assert_allclose(stats.mean, self.data.mean(axis=0))
+        np.testing.assert_allclose(stats.variance(ddof=1), self.data.var(axis=0, ddof=1))
+        np.testing.assert_array_equal(stats.min, self.data.min(axis=0))
+        np.testing.assert_array_equal(stats.max, self.data.max(axis=0))
+        self.assertEqual(stats.histogram.shape, (3, 30))
+        np.testing.assert_array_equal(stats.histogram.sum(axis=1), len(self.data))
+
+        q = [0.001, 0.05, 0.5, 0.95, 0.999]
+        errors = np.abs(stats.quantile(q) - np.quantile(self.data, q, axis=0))
+        self.assertTrue(np.all(errors < 0.03 * self.data.std(axis=0)))
+
+    def test_merged_workers_match_single_accumulator(self):
+        single = StreamingStats((3,), bins=np.linspace(-5, 10, 31)).update(self.data)
+        merged = StreamingStats((3,), bins=np.linspace(-5, 10, 31))
+        for chunk in np.array_split(self.data, 4):
+            merged.merge(StreamingStats((3,), bins=np.linspace(-5, 10, 31)).update(chunk))
+        np.testing.assert_allclose(merged.mean, single.mean)
+        np.testing.assert_allclose(merged.variance(), single.variance())
+        np.testing.assert_array_equal(merged.histogram, single.histogram)
+        np.testing.assert_allclose(merged.quantile([0.01, 0.5, 0.99]), single.quantile([0.01, 0.5, 0.99]), atol=0.05)
+        with self.assertRaises(ValueError):
+            merged.merge(StreamingStats((2,)))
+
+    def test_run_simulation_accumulators_match_histories(self):
+        histories = run_simulation(20000, rng=np.random.default_rng(1))
+        accumulators = run_simulation(20000, rng=np.random.default_rng(1), accumulate=True)
+        for history, accumulator in zip(histories, accumulators):
+            np.testing.assert_allclose(accumulator.mean, np.mean(history, axis=0))
+            np.testing.assert_allclose(accumulator.std(), np.std(history, axis=0))
+        layer1, layer2 = histories[:2]
+        np.testing.assert_array_equal(accumulators[0].histogram.sum(axis=-1), len(layer1))
+        self.assertEqual(accumulators[0].bin_edges[0], -80)
+        self.assertLessEqual(layer1.max(), accumulators[0].bin_edges[-1])
+        self.assertLessEqual(layer2.max(), accumulators[1].bin_edges[-1])
+
+
+if __name__ == '__main__':
+    unittest.main()